@@ -1,12 +1,61 @@
 import streamlit as st
 from .admin_services import (
-    process_upload,
+    start_upload_job,
+    get_upload_job,
+    resume_upload_job,
     get_filtered_orders,
     get_order_stats,
+    reconcile_counters,
+    backfill_order_parties,
 )
 
 from utils import export_orders_to_excel
-from db.orders import load_orders
+from db.orders import load_orders, sync_orders
+
+@st.fragment(run_every=1)
+def _upload_progress(job_id):
+    """Poll the running upload job once a second"""
+    job = get_upload_job(job_id)
+    if job is None or job["status"] in ("done", "failed"):
+        st.rerun()
+        return
+
+    counters = job["counters"]
+    handled = counters.get("written", 0) + counters.get("existing", 0) + counters.get("failed", 0)
+    parsed = counters.get("orders_parsed", 0)
+    st.progress(min(handled / parsed, 1.0) if parsed else 0.0)
+    st.caption(
+        f"{job['file']} · Parsed {counters.get('rows_parsed', 0)} rows "
+        f"({counters.get('rows_unchanged', 0)} unchanged) · Written {counters.get('written', 0)} · "
+        f"Already present {counters.get('existing', 0)} · Failed {counters.get('failed', 0)}"
+    )
+    if counters.get("status_changed") or counters.get("status_unchanged"):
+        st.caption(
+            f"Status updates · Changed {counters.get('status_changed', 0)} · "
+            f"Unchanged {counters.get('status_unchanged', 0)} · Unknown {counters.get('status_unknown', 0)}"
+        )
+
+def render_upload_job(job_id):
+    """Show the state of the admin's latest upload job"""
+    job = get_upload_job(job_id)
+    if job is None:
+        st.info("Upload job is no longer available.")
+        return
+
+    if job["status"] in ("queued", "running"):
+        _upload_progress(job_id)
+    elif job["status"] == "done" and job["result"].get("duplicate"):
+        st.info(f"{job['file']} was already imported for {job['platform'].capitalize()}; nothing to do.")
+    elif job["status"] == "done":
+        st.success(f"Successfully added {job['result']['added']} new orders from {job['platform'].capitalize()}")
+        if st.session_state.get("upload_job_loaded") != job_id:
+            load_orders(force=True)
+            st.session_state.upload_job_loaded = job_id
+    else:
+        st.error(f"Error: {job['error']}")
+        if st.button("Resume Upload"):
+            resume_upload_job(job_id)
+            st.rerun()
 
 def render_admin_panel():
     st.header("Admin Panel – Order Upload")
@@ -28,11 +77,7 @@ def render_admin_panel():
 
         with col1:
             if st.button("Process File"):
-                success, message = process_upload(uploaded_file, platform)
-                if success:
-                    st.success(f"Successfully added {message} new orders from {platform.capitalize()}")
-                else:
-                    st.error(f"Error: {message}")
+                st.session_state.upload_job_id = start_upload_job(uploaded_file, platform)
 
         with col2:
             if st.button("Export Orders to Excel"):
@@ -47,10 +92,17 @@ def render_admin_panel():
                 else:
                     st.info("No orders available to export.")
 
+    job_id = st.session_state.get("upload_job_id")
+    if job_id:
+        render_upload_job(job_id)
+
     # Display current order statistics
     st.markdown("---")
     st.subheader("Order Statistics")
 
+    if st.button("🔄 Full Reload from Database"):
+        sync_orders(full=True)
+
     stats = get_order_stats()
 
     col1, col2, col3 = st.columns(3)
@@ -58,6 +110,26 @@ def render_admin_panel():
     col2.metric("Picked", stats.get("picked", 0))
     col3.metric("Validated", stats.get("validated", 0))
 
+    if st.session_state.get("user_type") in [4, 5]:
+        with st.expander("Status Counters"):
+            st.caption("Recompute the dashboard counters from the orders collection and fix any drift.")
+            if st.button("Reconcile Counters"):
+                drift = reconcile_counters()
+                if drift.empty:
+                    st.success("Counters match the orders collection")
+                else:
+                    st.warning(f"Fixed {len(drift)} drifted counters")
+                    st.dataframe(drift, use_container_width=True)
+
+        with st.expander("Order Parties"):
+            st.caption("Stamp the party field on every order so party filters can run as Firestore queries.")
+            if st.button("Backfill Order Parties"):
+                progress = st.empty()
+                updated = backfill_order_parties(
+                    on_progress=lambda scanned, changed: progress.caption(f"Scanned {scanned} orders, updated {changed}")
+                )
+                st.success(f"Party stamped on {updated} orders")
+
     # ===============================
     # Orders Table
     # ===============================
@@ -1,37 +1,121 @@
+import io
+
+import pandas as pd
 import streamlit as st
-from db.orders import load_orders
-from utils import extract_order_data
-from database import add_orders_to_db, calculate_order_counts
-
-def process_upload(uploaded_file, platform):
-    """Handle file upload end-to-end"""
-    try:
-        orders_df = extract_order_data(uploaded_file, platform)
-        if orders_df is None or orders_df.empty:
-            return False, "No valid data found in file"
-
-        success, count = add_orders_to_db(orders_df, platform)
-        if not success:
-            return False, "Database insert failed"
-    
-        load_orders(force=True)
-        return True, count
-
-    except Exception as e:
-        return False, str(e)
-    
-def get_filtered_orders(party_filter):
-    """Apply party filter safely"""
-    df = st.session_state.orders_df.copy()
-    df["sku"] = df["sku"].astype(str).str.upper()
+from core.jobs import JobRunner
+from db.firestore import get_db_connection
+from db.orders import bulk_update_status
+from db.upload_ledger import RowLedger, file_fingerprint, find_upload, record_upload
+from core.order_parser import stream_order_batches
+from utils import get_party_filter_df
+from database import add_order_batches, calculate_order_counts, reconcile_order_counters, restamp_order_parties
+
+UPLOAD_JOB_COLLECTION = "upload_jobs"
+UPLOAD_WORKERS = 2  # uploads processed at the same time per process
+
+
+def _persist_job(snapshot):
+    """Record job state in Firestore so it outlives the admin's browser tab"""
+    db = get_db_connection()
+    if db is None:
+        return
+    db.collection(UPLOAD_JOB_COLLECTION).document(snapshot["id"]).set(
+        {**snapshot, "result": snapshot["result"] or {}}, merge=True
+    )
+
+
+@st.cache_resource
+def get_upload_runner():
+    return JobRunner(max_workers=UPLOAD_WORKERS, on_update=_persist_job)
+
+
+def _ingest_upload(job, data, filename, platform):
+    """Job body: stream the export into Firestore, reporting progress on job"""
+    db = get_db_connection()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+
+    fingerprint = file_fingerprint(data)
+    earlier = find_upload(db, fingerprint, platform)
+    if earlier is not None:
+        print(f"📒 {filename} was already imported at {earlier.get('imported_at')}; skipping")
+        return {"added": 0, "duplicate": True}
+
+    buffer = io.BytesIO(data)
+    buffer.name = filename
+    # Parsing restarts from the top on resume; writes skip committed chunks,
+    # whose counts are carried over from the attempt that wrote them
+    job.reset("rows_parsed", "rows_unchanged", "orders_parsed", "existing", "written", "failed",
+              "status_changed", "status_unchanged", "status_unknown", "status_failed")
+    job.add(**job.chunk_totals())
+    ledger = RowLedger(db, platform).load()
+
+    def order_batches():
+        for batch in stream_order_batches(buffer, platform, row_filter=ledger.fresh):
+            job.add(rows_parsed=batch.rows, orders_parsed=len(batch.orders))
+            job.set(rows_unchanged=ledger.unchanged)
+            if batch.status_updates is not None and not batch.status_updates.empty:
+                moved = bulk_update_status(batch.status_updates, platform=platform)
+                job.add(status_changed=moved["changed"], status_unchanged=moved["unchanged"],
+                        status_unknown=moved["unknown"], status_failed=moved["failed"])
+            yield batch.orders
 
-    if party_filter == "Kangan":
-        df = df[df["sku"].str.startswith(("K", "L"))]
-    elif party_filter == "RS":
-        df = df[df["sku"].str.startswith("R")]
+    def on_chunk(report):
+        job.add(existing=report["skipped"], written=report["added"], failed=report["failed"])
+        if not report["failed"]:
+            job.complete_chunk(report["chunk"], existing=report["skipped"], written=report["added"])
 
-    return df
+    success, added = add_order_batches(
+        order_batches(), platform, on_chunk=on_chunk, skip_chunks=set(job.completed_chunks)
+    )
+    if job.counters.get("orders_parsed", 0) == 0 and ledger.unchanged == 0:
+        raise ValueError("No valid data found in file")
+    if not success or job.counters.get("status_failed", 0):
+        raise RuntimeError("Some chunks failed to write; resume the job to retry them")
+
+    # Only a fully imported file may be skipped next time
+    ledger.commit()
+    record_upload(db, fingerprint, platform, filename, {
+        "rows": job.counters.get("rows_parsed", 0),
+        "rows_unchanged": ledger.unchanged,
+        "added": job.counters.get("written", 0),
+    })
+    return {"added": job.counters.get("written", 0), "duplicate": False}
+
+
+def start_upload_job(uploaded_file, platform):
+    """Queue an upload in the background and return its job id"""
+    return get_upload_runner().submit(
+        "upload",
+        _ingest_upload,
+        uploaded_file.getvalue(),
+        uploaded_file.name,
+        platform,
+        meta={"file": uploaded_file.name, "platform": platform},
+    )
+
+
+def get_upload_job(job_id):
+    """Snapshot of an upload job, or None if this process does not know it"""
+    job = get_upload_runner().get(job_id)
+    return job.snapshot() if job else None
+
+
+def resume_upload_job(job_id):
+    return get_upload_runner().resume(job_id)
+
+def get_filtered_orders(party_filter):
+    """Apply party filter safely (same party rules as every other page)"""
+    return get_party_filter_df(st.session_state.orders_df, party_filter)
 
 def get_order_stats():
     """Cached order statistics"""
-    return calculate_order_counts()
\ No newline at end of file
+    return calculate_order_counts()
+
+def reconcile_counters():
+    """Recompute status counters and return the drift report"""
+    return pd.DataFrame(reconcile_order_counters())
+
+def backfill_order_parties(on_progress=None):
+    """Stamp the party field on every order; returns the number updated"""
+    return restamp_order_parties(on_progress=on_progress)
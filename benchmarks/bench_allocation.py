@@ -0,0 +1,88 @@
+"""
+Benchmark the allocation strategies against the previous greedy selection.
+
+For each synthetic SKU (a handful to a few hundred open orders) a random
+feasible quantity is requested. Reports how often each approach finds an exact
+set of orders and the mean time per allocation.
+
+Run from the repository root:
+    python benchmarks/bench_allocation.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.allocation import STRATEGIES, Candidate, allocate  # noqa: E402
+
+ORDERS_PER_SKU = (5, 50, 300)
+CASES = 300
+QUANTITIES = [1, 1, 1, 2, 2, 3, 5, 6]
+
+
+def legacy_greedy(candidates, quantity):
+    """The quantity>1 then quantity==1 greedy pass this replaced"""
+    by_created = sorted(candidates, key=lambda c: c.created_at)
+    high = [c for c in by_created if c.quantity > 1]
+    low = [c for c in by_created if c.quantity == 1]
+    selected, remaining = [], quantity
+    for c in high + low:
+        if c.quantity <= remaining:
+            selected.append(c)
+            remaining -= c.quantity
+    return selected if remaining == 0 else None
+
+
+def synthetic_cases(orders_per_sku, seed=0):
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    cases = []
+    for _ in range(CASES):
+        candidates = [
+            Candidate(
+                order_id=f"OD{i:06d}",
+                quantity=int(rng.choice(QUANTITIES)),
+                dispatch_date=(start + timedelta(days=int(rng.integers(0, 7)))).strftime("%d-%m-%Y"),
+                created_at=start + timedelta(minutes=int(rng.integers(0, 10_000))),
+                ref=None,
+            )
+            for i in range(orders_per_sku)
+        ]
+        # Request the total of a random subset so an exact answer always exists
+        subset = rng.random(orders_per_sku) < 0.3
+        quantity = sum(c.quantity for c, take in zip(candidates, subset) if take) or candidates[0].quantity
+        cases.append((candidates, quantity))
+    return cases
+
+
+def run(select, cases):
+    solved = 0
+    for candidates, quantity in cases:
+        chosen = select(candidates, quantity)
+        if chosen is not None:
+            assert sum(c.quantity for c in chosen) == quantity
+            assert len({c.order_id for c in chosen}) == len(chosen)
+            solved += 1
+    return solved
+
+
+def main():
+    approaches = {"legacy_greedy": legacy_greedy}
+    for name in STRATEGIES:
+        approaches[name] = lambda c, q, name=name: allocate(c, q, name)
+
+    print(f"{'orders/sku':>10} {'approach':>18} {'solved':>8} {'mean (ms)':>10}")
+    for n in ORDERS_PER_SKU:
+        cases = synthetic_cases(n)
+        for name, select in approaches.items():
+            solved = run(select, cases)
+            elapsed = min(timeit.repeat(lambda: run(select, cases), number=1, repeat=3))
+            print(f"{n:>10} {name:>18} {solved / len(cases):>7.0%} {elapsed / len(cases) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
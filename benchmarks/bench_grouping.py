@@ -0,0 +1,72 @@
+"""
+Benchmark get_orders_grouped_by_sku against the previous groupby.apply version.
+
+Run from the repository root:
+    python benchmarks/bench_grouping.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.orders import get_orders_grouped_by_sku  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+
+
+def legacy_grouped_by_sku(orders_df, status=None):
+    """The groupby.apply + iterrows implementation this replaced"""
+    orders_df = orders_df.copy()
+    if status:
+        orders_df = orders_df[orders_df["status"] == status]
+    orders_df = orders_df.dropna(subset=["dispatch_date"])
+
+    def get_dispatch_breakdown(sub_df):
+        grouped = sub_df.groupby("dispatch_date")["quantity"].sum().reset_index()
+        return [
+            {"date": row["dispatch_date"], "quantity": int(row["quantity"])}
+            for _, row in grouped.iterrows()
+        ]
+
+    grouped_df = orders_df.groupby("sku").apply(lambda df: pd.Series({
+        "total_quantity": int(df["quantity"].sum()),
+        "order_count": df["order_id"].nunique(),
+        "dispatch_breakdown": get_dispatch_breakdown(df)
+    })).reset_index()
+    return grouped_df.sort_values(by=["sku"], ascending=[True])
+
+
+def synthetic_orders(n, seed=0):
+    rng = np.random.default_rng(seed)
+    n_skus = max(n // 20, 10)
+    dates = pd.date_range("2025-01-01", periods=7).strftime("%d-%m-%Y")
+    return pd.DataFrame({
+        "order_id": [f"OD{i:09d}" for i in range(n)],
+        "sku": [f"K{v:05d}" for v in rng.integers(0, n_skus, n)],
+        "quantity": rng.choice([1, 1, 1, 2, 3], n),
+        "status": rng.choice(["new", "picked", "validated"], n),
+        "dispatch_date": rng.choice(dates, n),
+    })
+
+
+def main():
+    print(f"{'orders':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for n in SIZES:
+        df = synthetic_orders(n)
+
+        expected = legacy_grouped_by_sku(df, "new").reset_index(drop=True)
+        actual = get_orders_grouped_by_sku(df, "new")
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+        legacy = min(timeit.repeat(lambda: legacy_grouped_by_sku(df, "new"), number=1, repeat=REPEAT))
+        vectorized = min(timeit.repeat(lambda: get_orders_grouped_by_sku(df, "new"), number=1, repeat=REPEAT))
+        print(f"{n:>8} {legacy:>12.4f} {vectorized:>15.4f} {legacy / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
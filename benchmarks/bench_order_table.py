@@ -0,0 +1,83 @@
+"""
+Memory benchmark: object-column order table vs the typed schema.
+
+Builds 50k synthetic order records shaped like Firestore order documents and
+compares the deep memory footprint of pd.DataFrame(records) with
+typed_orders(...), plus the time of a typical status + party filter.
+
+Run from the repository root:
+    python benchmarks/bench_order_table.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.order_schema import memory_usage_mb, typed_orders  # noqa: E402
+
+ORDERS = 50_000
+REPEAT = 5
+PARTIES = {"K": "KANGAN", "L": "KANGAN", "R": "RS", "S": "SM"}
+
+
+def synthetic_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    users = [f"user{i}" for i in range(25)] + [""]
+    start = datetime(2025, 1, 1)
+    dates = [(start + timedelta(days=d)).strftime("%d-%m-%Y") for d in range(7)]
+    skus = [f"{rng.choice(list('KLRS'))}{v:05d}" for v in range(n // 20)]
+    return [
+        {
+            "order_id": f"OD{i:012d}",
+            "sku": str(rng.choice(skus)),
+            "quantity": int(rng.choice([1, 1, 1, 2, 3])),
+            "status": str(rng.choice(["new", "picked", "validated", "cancelled"])),
+            "platform": str(rng.choice(["meesho", "flipkart"])),
+            "picked_by": str(rng.choice(users)),
+            "validated_by": str(rng.choice(users)),
+            "dispatch_date": str(rng.choice(dates)),
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i),
+        }
+        for i in range(n)
+    ]
+
+
+def party_of(sku):
+    return PARTIES.get(sku[:1], "")
+
+
+def main():
+    records = synthetic_records(ORDERS)
+
+    plain = pd.DataFrame(records)
+    plain["party"] = plain["sku"].map(party_of)
+    typed = typed_orders(pd.DataFrame(records), party_of)
+
+    def filter_plain():
+        return plain[(plain["status"] == "new") & (plain["party"] == "KANGAN")]
+
+    def filter_typed():
+        return typed[(typed["status"] == "new") & (typed["party"] == "KANGAN")]
+
+    assert len(filter_plain()) == len(filter_typed())
+
+    rows = (
+        ("object columns", plain, filter_plain),
+        ("typed schema", typed, filter_typed),
+    )
+    print(f"{ORDERS} orders")
+    print(f"{'representation':>16} {'memory (MiB)':>13} {'filter (ms)':>12}")
+    for name, df, run in rows:
+        elapsed = min(timeit.repeat(run, number=1, repeat=REPEAT))
+        print(f"{name:>16} {memory_usage_mb(df):>13.1f} {elapsed * 1000:>12.2f}")
+    print(f"memory ratio: {memory_usage_mb(plain) / memory_usage_mb(typed):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the streaming export parser against whole-file reading.
+
+Writes synthetic Flipkart CSV exports of growing size and reports, for the
+legacy path (read whole file, then transform) and the streaming path, the
+time until the first batch of orders is ready and the peak Python memory
+(tracemalloc) while parsing the whole file.
+
+Run from the repository root:
+    python benchmarks/bench_parser.py
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.order_parser import parse_flipkart_chunk, stream_order_batches  # noqa: E402
+
+SIZES = (10_000, 50_000, 200_000)
+FLIPKART_COLUMNS = 30
+
+
+def synthetic_flipkart_csv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {f"col{i}": ["x"] * n for i in range(FLIPKART_COLUMNS)}
+    data["col3"] = [f"OD{i:015d}" for i in range(n)]
+    data["col8"] = [f"k{v:05d}" for v in rng.integers(0, 5000, n)]
+    data["col18"] = rng.choice(["1", "1", "2", "3"], n)
+    data["col28"] = pd.Series(pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 7, n), unit="D")).dt.strftime("%b %d, %Y %H:%M:%S")
+    buffer = io.BytesIO()
+    pd.DataFrame(data).to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+class NamedBuffer(io.BytesIO):
+    name = "export.csv"
+
+
+def legacy(raw):
+    df = pd.read_csv(NamedBuffer(raw), dtype=str, keep_default_na=False)
+    yield parse_flipkart_chunk(df).orders
+
+
+def streaming(raw):
+    for batch in stream_order_batches(NamedBuffer(raw), "flipkart"):
+        yield batch.orders
+
+
+def measure(parse, raw):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    rows = 0
+    for orders in parse(raw):
+        if first is None:
+            first = time.perf_counter() - start
+        rows += len(orders)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, first, total, peak / (1024 * 1024)
+
+
+def main():
+    print(f"{'rows':>8} {'path':>10} {'first batch (s)':>16} {'total (s)':>10} {'peak (MiB)':>11}")
+    for n in SIZES:
+        raw = synthetic_flipkart_csv(n)
+        for name, parse in (("legacy", legacy), ("streaming", streaming)):
+            rows, first, total, peak = measure(parse, raw)
+            assert rows == n
+            print(f"{n:>8} {name:>10} {first:>16.3f} {total:>10.3f} {peak:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
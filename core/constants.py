@@ -1 +1,13 @@
-# statuses, enums, mappings
\ No newline at end of file
+# statuses, enums, mappings
+
+# Orders updated within this many days make up the working order set
+ORDER_WINDOW_DAYS = 7
+
+# Keep a process-wide order table current with a Firestore on_snapshot listener
+ORDER_LISTENER_ENABLED = True
+
+# Without a live listener, sessions delta-sync the shared order table at most this often (seconds)
+ORDER_POLL_SECONDS = 15
+
+# Seconds a picker holds a SKU while its card is on screen; renewed while shown
+SKU_LEASE_SECONDS = 120
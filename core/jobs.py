@@ -0,0 +1,169 @@
+# background jobs with progress counters
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    One background job and its progress.
+
+    The job function updates counters through add() from its worker thread;
+    the UI reads snapshot(). completed_chunks maps each finished unit of work
+    to the counters it produced, so a failed job can be resumed without
+    redoing them and its totals rebuilt without counting them twice.
+    """
+
+    def __init__(self, kind, fn, args, kwargs, meta=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.meta = dict(meta or {})
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self.status = QUEUED
+        self.counters = {}
+        self.completed_chunks = {}
+        self.result = None
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, **counters):
+        with self._lock:
+            self.counters.update(counters)
+
+    def reset(self, *names):
+        with self._lock:
+            for name in names:
+                self.counters[name] = 0
+
+    def complete_chunk(self, index, **counters):
+        with self._lock:
+            self.completed_chunks[index] = counters
+
+    def chunk_totals(self):
+        """Counters summed over the completed chunks"""
+        totals = {}
+        with self._lock:
+            for counters in self.completed_chunks.values():
+                for name, value in counters.items():
+                    totals[name] = totals.get(name, 0) + value
+        return totals
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self):
+        """Point-in-time copy of the job's state, safe to read from any thread"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "counters": dict(self.counters),
+                "completed_chunks": len(self.completed_chunks),
+                "result": self.result,
+                "error": self.error,
+                "attempts": self.attempts,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                **self.meta,
+            }
+
+
+class JobRunner:
+    """
+    Thread pool running Jobs in the background.
+
+    fn(job, *args, **kwargs) does the work and returns the job's result;
+    raising marks the job failed. on_update(snapshot) is called when a job
+    starts and finishes, e.g. to persist its state.
+    """
+
+    def __init__(self, max_workers=2, on_update=None, keep=50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._on_update = on_update
+        self._keep = keep
+
+    def submit(self, kind, fn, *args, meta=None, **kwargs):
+        """Queue a new job and return its id"""
+        job = Job(kind, fn, args, kwargs, meta)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def resume(self, job_id):
+        """
+        Re-run a failed job; its completed_chunks are kept so finished work is skipped.
+
+        Jobs live in this runner's memory, so only jobs of this process can be resumed.
+        """
+        job = self.get(job_id)
+        if job is None or job.status != FAILED:
+            return False
+        job.status = QUEUED
+        job.error = None
+        self._executor.submit(self._run, job)
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshots(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in sorted(jobs, key=lambda j: j.created_at, reverse=True)]
+
+    def _run(self, job):
+        job.status = RUNNING
+        job.attempts += 1
+        job.started_at = time.time()
+        job.finished_at = None
+        self._notify(job)
+        try:
+            job.result = job._fn(job, *job._args, **job._kwargs)
+            job.status = DONE
+        except Exception as e:
+            print(f"❌ Job {job.id} ({job.kind}) failed: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = time.time()
+        self._notify(job)
+
+    def _notify(self, job):
+        if self._on_update is None:
+            return
+        try:
+            self._on_update(job.snapshot())
+        except Exception as e:
+            print(f"⚠️ Could not record job {job.id}: {e}")
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond keep"""
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.created_at)
+        for job in finished[:max(0, len(self._jobs) - self._keep)]:
+            del self._jobs[job.id]
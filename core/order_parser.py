@@ -0,0 +1,148 @@
+# streaming parser for platform order exports
+# CSV is read in chunks and XLSX row by row (openpyxl read_only), so only one
+# chunk of raw rows is in memory at a time. Chunks are normalised with
+# vectorised pandas ops and yielded as OrderBatch. No Streamlit calls here.
+from collections import namedtuple
+
+import pandas as pd
+
+PARSE_CHUNK_ROWS = 5000
+DATE_OUTPUT_FORMAT = "%d-%m-%Y"
+ORDER_COLUMNS = ["order_id", "sku", "quantity", "dispatch_date", "status"]
+
+MEESHO_MIN_COLUMNS = 12
+MEESHO_STATUS_UPDATES = {"cancelled", "shipped", "delivered"}
+MEESHO_PENDING = {"pending", "ready_to_ship"}
+MEESHO_DISPATCH_SHIFT = pd.Timedelta(days=2)
+MEESHO_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y")
+FLIPKART_DATE_FORMATS = ("%b %d, %Y %H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+# orders: cleaned new orders; status_updates: raw rows whose status changed
+# on the platform (Meesho only); rows: raw rows read in this chunk
+OrderBatch = namedtuple("OrderBatch", ["orders", "status_updates", "rows"])
+
+
+class OrderFileError(ValueError):
+    """The uploaded file does not look like an export of the chosen platform"""
+
+
+def iter_raw_chunks(file_buffer, chunk_rows=PARSE_CHUNK_ROWS):
+    """Yield the file's data rows as string DataFrames of at most chunk_rows rows"""
+    filename = file_buffer.name.lower()
+
+    if filename.endswith(".csv"):
+        yield from pd.read_csv(file_buffer, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+        return
+
+    if filename.endswith(".xls"):
+        # Legacy binary workbooks cannot be streamed; read once and slice
+        df = pd.read_excel(file_buffer, dtype=str, keep_default_na=False)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    yield from _iter_xlsx_chunks(file_buffer, chunk_rows)
+
+
+def _iter_xlsx_chunks(file_buffer, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_buffer, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"column_{i}" for i, c in enumerate(header)]
+
+        width = len(columns)
+        buffer = []
+        for row in rows:
+            values = ["" if value is None else str(value) for value in row[:width]]
+            buffer.append(values + [""] * (width - len(values)))
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def parse_dates(values, formats):
+    """Vectorised parse trying each format in turn; unparsed values become NaT"""
+    values = values.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        # Spreadsheet cells may carry a time part the format does not expect
+        candidates = values[missing] if "%H" in fmt else values[missing].str.slice(0, 10)
+        parsed[missing] = pd.to_datetime(candidates, format=fmt, errors="coerce")
+    return parsed
+
+
+def clean_orders(df):
+    """Drop rows without id, SKU or dispatch date and normalise dtypes"""
+    df = df.dropna(subset=["order_id", "sku", "dispatch_date"])
+    df = df[(df["order_id"] != "") & ~df["sku"].isin({"", "NAN"})]
+    if df.empty:
+        return pd.DataFrame(columns=ORDER_COLUMNS)
+    return df.assign(quantity=df["quantity"].astype(int))
+
+
+def parse_meesho_chunk(raw):
+    """Split a Meesho chunk into new orders and platform status updates"""
+    if raw.shape[1] < MEESHO_MIN_COLUMNS:
+        raise OrderFileError("Invalid Meesho file format.")
+
+    status = raw.iloc[:, 0].astype(str).str.lower().str.strip()
+    status_updates = raw[status.isin(MEESHO_STATUS_UPDATES)]
+    pending = raw[status.isin(MEESHO_PENDING)]
+
+    dispatch = parse_dates(pending.iloc[:, 3], MEESHO_DATE_FORMATS) + MEESHO_DISPATCH_SHIFT
+    orders = pd.DataFrame({
+        "order_id": pending.iloc[:, 1].astype(str).str.strip(),
+        "sku": pending.iloc[:, 7].astype(str).str.upper().str.strip(),
+        "quantity": pd.to_numeric(pending.iloc[:, 9], errors="coerce").fillna(1),
+        "dispatch_date": dispatch.dt.strftime(DATE_OUTPUT_FORMAT),
+        "status": "new",
+    })
+    return OrderBatch(clean_orders(orders), status_updates, len(raw))
+
+
+def parse_flipkart_chunk(raw):
+    """Normalise a Flipkart chunk into new orders"""
+    dispatch = parse_dates(raw.iloc[:, 28], FLIPKART_DATE_FORMATS)
+    orders = pd.DataFrame({
+        "order_id": raw.iloc[:, 3].astype(str).str.strip(),
+        "sku": raw.iloc[:, 8].astype(str).str.upper().str.strip(),
+        "quantity": pd.to_numeric(raw.iloc[:, 18], errors="coerce").fillna(1),
+        "dispatch_date": dispatch.dt.strftime(DATE_OUTPUT_FORMAT),
+        "status": "new",
+    })
+    return OrderBatch(clean_orders(orders), None, len(raw))
+
+
+PARSERS = {
+    "meesho": parse_meesho_chunk,
+    "flipkart": parse_flipkart_chunk,
+}
+
+
+def stream_order_batches(file_buffer, platform, chunk_rows=PARSE_CHUNK_ROWS, row_filter=None):
+    """
+    Yield an OrderBatch per chunk of the uploaded export.
+
+    row_filter(raw) may drop raw rows before parsing (e.g. rows already
+    imported); OrderBatch.rows still counts every row read.
+    """
+    if platform not in PARSERS:
+        raise OrderFileError(f"Unsupported platform: {platform}")
+    parse = PARSERS[platform]
+    for raw in iter_raw_chunks(file_buffer, chunk_rows):
+        rows = len(raw)
+        if row_filter is not None:
+            raw = row_filter(raw)
+        yield parse(raw)._replace(rows=rows)
@@ -1,12 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from database import get_db_connection,get_orders_from_db, calculate_order_counts, get_user_productivity
+from database import get_db_connection,load_orders, calculate_order_counts, get_user_productivity
 from utils import export_orders_to_excel
 
 def render_dashboard():
-    if "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()
+    load_orders()
     
     """Render the dashboard with order statistics and visualizations"""
     st.session_state.current_index = 0
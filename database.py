@@ -4,24 +4,40 @@ This module consolidates imports from db submodules organized by entity type.
 """
 
 # Firestore connection
-from db.firestore import get_db_connection, init_database
+from db.firestore import get_db_connection, get_connection_stats, init_database
 
 # User operations
-from db.users import get_pass, get_party, get_user_type, get_user_productivity, load_party_rules,update_sku_party
+from db.users import get_pass, get_party, get_user_type, get_user_productivity, get_usernames, load_party_rules, party_matcher, update_sku_party
+
+# Product catalog
+from db.catalog import get_product_catalog, get_product_skus
 
 # Order operations
 from db.orders import (
     add_orders_to_db,
+    add_order_batches,
     get_orders_from_db,
+    load_orders,
+    sync_orders,
+    patch_orders,
     get_order_details,
     update_status,
+    update_order_fields,
     get_orders_grouped_by_sku,
+    get_sku_groups,
     get_product_image_url,
+    get_product_image_urls,
+    get_image_cache_stats,
     update_orders_for_sku,
+    update_orders_bulk,
     calculate_order_counts,
     out_of_stock,
 )
 
+# Counter operations
+from db.counters import read_status_counts, reconcile_order_counters
+from db.party_stamp import restamp_order_parties
+
 # Return operations
 from db.returns import (
     get_returns_from_db,
@@ -51,24 +67,43 @@ from db.out_of_stock import (
 __all__ = [
     # Firestore
     "get_db_connection",
+    "get_connection_stats",
     "init_database",
     # Users
     "get_pass",
     "get_party",
     "get_user_type",
     "get_user_productivity",
+    "get_usernames",
     "load_party_rules",
+    "party_matcher",
     "update_sku_party",
+    # Product catalog
+    "get_product_catalog",
+    "get_product_skus",
     # Orders
     "add_orders_to_db",
+    "add_order_batches",
     "get_orders_from_db",
+    "load_orders",
+    "sync_orders",
+    "patch_orders",
     "get_order_details",
     "update_status",
+    "update_order_fields",
     "get_orders_grouped_by_sku",
+    "get_sku_groups",
     "get_product_image_url",
+    "get_product_image_urls",
+    "get_image_cache_stats",
     "update_orders_for_sku",
+    "update_orders_bulk",
     "calculate_order_counts",
     "out_of_stock",
+    # Counters
+    "read_status_counts",
+    "reconcile_order_counters",
+    "restamp_order_parties",
     # Returns
     "get_returns_from_db",
     "enter_return_data",
@@ -0,0 +1,116 @@
+"""
+Server-side aggregation queries for order metrics
+
+Counts and sums are computed by Firestore (count()/sum()), so a dashboard
+render costs a few aggregation reads instead of downloading every order.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from core.constants import ORDER_WINDOW_DAYS
+from db.firestore import get_db_connection
+from db.party_stamp import party_field, party_stamped
+
+AGGREGATION_TTL = 30  # seconds an aggregation result is reused across reruns
+COUNTED_STATUSES = ("new", "picked", "validated")
+
+
+def _window_query(db, party=None):
+    since = datetime.utcnow() - timedelta(days=ORDER_WINDOW_DAYS)
+    query = db.collection("orders").where("updated_at", ">=", since)
+    if party:
+        query = query.where("party", "==", party_field(party))
+    return query
+
+
+def _party_scope_ready(db, party):
+    """Party-scoped aggregations need every order to carry the party field"""
+    if not party:
+        return True
+    if party_stamped(db):
+        return True
+    print("⚠️ Orders not party-stamped yet; skipping party-scoped aggregation")
+    return False
+
+
+def _aggregate(query, sum_field=None):
+    """Run count() (and optionally sum()) on a query; return (count, total)"""
+    aggregation = query.count(alias="count")
+    if sum_field:
+        aggregation = aggregation.sum(sum_field, alias="total")
+
+    values = {result.alias: result.value for result in aggregation.get()[0]}
+    return int(values.get("count") or 0), int(values.get("total") or 0)
+
+
+@st.cache_data(ttl=AGGREGATION_TTL, show_spinner=False)
+def aggregate_status_counts(party=None):
+    """
+    Count orders per status in the order window, optionally for one party.
+
+    None if the database is unavailable or party-scoped counts are not possible yet.
+    """
+    db = get_db_connection()
+    if db is None:
+        print("❌ Database connection failed in aggregate_status_counts")
+        return None
+
+    try:
+        if not _party_scope_ready(db, party):
+            return None
+        with ThreadPoolExecutor(max_workers=len(COUNTED_STATUSES)) as executor:
+            results = executor.map(
+                lambda status: _aggregate(_window_query(db, party).where("status", "==", status)),
+                COUNTED_STATUSES,
+            )
+            return {status: count for status, (count, _) in zip(COUNTED_STATUSES, results)}
+    except Exception as e:
+        print(f"❌ Error aggregating order counts: {e}")
+        return None
+
+
+@st.cache_data(ttl=AGGREGATION_TTL, show_spinner=False)
+def aggregate_user_productivity(users, party=None):
+    """
+    Picked/validated order counts and quantities per user in the order window.
+
+    Returns a list of row dicts, or None if the database is unavailable or
+    party-scoped numbers are not possible yet.
+    """
+    db = get_db_connection()
+    if db is None:
+        print("❌ Database connection failed in aggregate_user_productivity")
+        return None
+
+    try:
+        if not _party_scope_ready(db, party):
+            return None
+    except Exception as e:
+        print(f"❌ Error checking party stamping: {e}")
+        return None
+
+    def user_row(user):
+        picked_count, picked_quantity = _aggregate(
+            _window_query(db, party).where("picked_by", "==", user), sum_field="quantity"
+        )
+        validated_count, validated_quantity = _aggregate(
+            _window_query(db, party).where("validated_by", "==", user), sum_field="quantity"
+        )
+        return {
+            "user": user,
+            "picked_count": picked_count,
+            "picked_quantity": picked_quantity,
+            "validated_count": validated_count,
+            "validated_quantity": validated_quantity,
+        }
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            rows = list(executor.map(user_row, users))
+    except Exception as e:
+        print(f"❌ Error aggregating user productivity: {e}")
+        return None
+
+    return [row for row in rows if row["picked_count"] or row["validated_count"]]
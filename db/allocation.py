@@ -0,0 +1,185 @@
+"""
+Order allocation for SKU status transitions
+
+Given the orders of one SKU in one status, pick the orders whose quantities
+add up exactly to the requested quantity. Strategies only change the order of
+preference; all of them find an exact combination whenever one exists, so a
+request never fails just because a greedy pass took the wrong orders.
+"""
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+
+DISPATCH_DATE_FORMAT = "%d-%m-%Y"  # how ingest stores dispatch_date
+
+Candidate = namedtuple("Candidate", ["order_id", "quantity", "dispatch_date", "created_at", "ref"])
+
+
+def dispatch_day(value):
+    """Comparable day for a stored dispatch_date (string, date or datetime), or None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_day(str(value).strip())
+
+
+@lru_cache(maxsize=1024)
+def _parse_day(text):
+    try:
+        return datetime.strptime(text, DISPATCH_DATE_FORMAT).date()
+    except ValueError:
+        try:
+            return datetime.fromisoformat(text).date()
+        except ValueError:
+            return None
+
+
+def _created_key(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float("inf")
+
+
+def _dispatch_key(candidate):
+    day = dispatch_day(candidate.dispatch_date)
+    return (day is None, day or date.min, _created_key(candidate.created_at))
+
+
+def _fifo_key(candidate):
+    return _created_key(candidate.created_at)
+
+
+def _first_exact_subset(candidates, quantity):
+    """
+    Earliest-preferred subset summing exactly to quantity, or None.
+
+    Walks the candidates in order and takes each one whenever the rest can
+    still complete the total; when a greedy pass would succeed this picks the
+    same orders, otherwise it still finds a valid combination.
+    """
+    mask = (1 << (quantity + 1)) - 1
+    reachable = [0] * (len(candidates) + 1)  # reachable[i]: sums buildable from candidates[i:]
+    reachable[-1] = 1
+    for i in range(len(candidates) - 1, -1, -1):
+        q = candidates[i].quantity
+        reachable[i] = (reachable[i + 1] | (reachable[i + 1] << q)) & mask
+
+    if not (reachable[0] >> quantity) & 1:
+        return None
+
+    selected, remaining = [], quantity
+    for i, candidate in enumerate(candidates):
+        if remaining == 0:
+            break
+        q = candidate.quantity
+        if q <= remaining and (reachable[i + 1] >> (remaining - q)) & 1:
+            selected.append(candidate)
+            remaining -= q
+    return selected
+
+
+def _fewest_subset(candidates, quantity):
+    """Exact subset with the fewest orders (ties go to earlier candidates), or None"""
+    n = len(candidates)
+    unreachable = n + 1
+    fewest = np.full((n + 1, quantity + 1), unreachable, dtype=np.int32)  # fewest[i][s] over candidates[i:]
+    fewest[n, 0] = 0
+    for i in range(n - 1, -1, -1):
+        q = candidates[i].quantity
+        fewest[i] = fewest[i + 1]
+        if q <= quantity:
+            fewest[i, q:] = np.minimum(fewest[i + 1, q:], fewest[i + 1, :quantity + 1 - q] + 1)
+
+    if fewest[0, quantity] >= unreachable:
+        return None
+
+    selected, remaining = [], quantity
+    for i, candidate in enumerate(candidates):
+        if remaining == 0:
+            break
+        q = candidate.quantity
+        if q <= remaining and fewest[i + 1, remaining - q] + 1 == fewest[i, remaining]:
+            selected.append(candidate)
+            remaining -= q
+    return selected
+
+
+def earliest_dispatch(candidates, quantity):
+    """Orders due first (then oldest first)"""
+    return _first_exact_subset(sorted(candidates, key=_dispatch_key), quantity)
+
+
+def exact_fit(candidates, quantity):
+    """A single order of exactly the quantity if there is one, else oldest orders first"""
+    ordered = sorted(candidates, key=_fifo_key)
+    for candidate in ordered:
+        if candidate.quantity == quantity:
+            return [candidate]
+    return _first_exact_subset(ordered, quantity)
+
+
+def fewest_orders(candidates, quantity):
+    """As few orders as possible, preferring earlier dispatch dates"""
+    return _fewest_subset(sorted(candidates, key=_dispatch_key), quantity)
+
+
+STRATEGIES = {
+    "earliest_dispatch": earliest_dispatch,
+    "exact_fit": exact_fit,
+    "fewest_orders": fewest_orders,
+}
+DEFAULT_STRATEGY = "earliest_dispatch"
+
+
+def allocate(candidates, quantity, strategy=DEFAULT_STRATEGY, dispatch_date=None):
+    """
+    Choose orders whose quantities sum exactly to quantity.
+
+    Args:
+        candidates: Iterable of Candidate
+        quantity: Total quantity to allocate
+        strategy: Name in STRATEGIES or a callable(candidates, quantity)
+        dispatch_date: Only allocate from orders due on this day
+
+    Returns:
+        List of chosen Candidate, or None when no exact combination exists
+    """
+    quantity = int(quantity)
+    if quantity <= 0:
+        return []
+
+    pick = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    candidates = [c for c in candidates if c.quantity > 0]
+    if dispatch_date is not None:
+        day = dispatch_day(dispatch_date)
+        candidates = [c for c in candidates if dispatch_day(c.dispatch_date) == day]
+
+    if sum(c.quantity for c in candidates) < quantity:
+        return None
+    return pick(candidates, quantity)
+
+
+def allocate_by_date(candidates, quantities, strategy=DEFAULT_STRATEGY):
+    """
+    Allocate separately for each dispatch date.
+
+    Args:
+        candidates: Iterable of Candidate
+        quantities: {dispatch_date: quantity}
+
+    Returns:
+        List of chosen Candidate across all dates, or None if any date falls short
+    """
+    candidates = list(candidates)
+    selected = []
+    for dispatch_date, quantity in quantities.items():
+        chosen = allocate(candidates, quantity, strategy, dispatch_date)
+        if chosen is None:
+            return None
+        selected.extend(chosen)
+    return selected
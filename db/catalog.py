@@ -0,0 +1,163 @@
+"""
+Process-wide product catalog (sku, img_url, party) kept live by a listener
+"""
+import threading
+
+import streamlit as st
+
+from db.firestore import get_db_connection
+
+CATALOG_READY_TIMEOUT = 15  # seconds to wait for the initial products snapshot
+
+
+class ProductCatalog:
+    """
+    Compact in-memory index of the products collection.
+
+    The first snapshot of each watch loads every product (replacing what an
+    earlier watch left behind); after that the on_snapshot listener only
+    delivers changed products. Lookups are by lower-cased SKU, matching how
+    products are stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()  # one restart at a time
+        self._products = {}  # sku (lower) -> (sku as stored, img_url, party)
+        self._sku_list = None
+        self._watch = None
+        self._initial = True
+        self._generation = 0  # bumped per watch; callbacks of older watches are dropped
+        self._ready = threading.Event()
+
+    def ensure_running(self, wait=True):
+        """
+        Start (or restart) the listener if needed; return True once the catalog is loaded.
+
+        wait=False returns at once, False while the initial snapshot of a new
+        watch is still loading, so page renders never block.
+        """
+        with self._restart_lock:
+            with self._lock:
+                needs_start = self._watch is None or not self._watch.is_active
+            started = self._restart() if needs_start else True
+        if not wait:
+            return started and self._ready.is_set()
+        return started and self._ready.wait(timeout=CATALOG_READY_TIMEOUT)
+
+    def sku_list(self):
+        """Sorted SKUs as stored in the products collection"""
+        with self._lock:
+            if self._sku_list is None:
+                self._sku_list = sorted({entry[0] for entry in self._products.values()})
+            return self._sku_list
+
+    def has_sku(self, sku):
+        return _key(sku) in self._products
+
+    def image_url(self, sku):
+        entry = self._products.get(_key(sku))
+        return entry[1] if entry else None
+
+    def image_urls(self, skus):
+        return {sku: self.image_url(sku) for sku in skus}
+
+    def party(self, sku):
+        entry = self._products.get(_key(sku))
+        return entry[2] if entry else None
+
+    def _restart(self):
+        """Close the current watch, then open a new one (caller holds _restart_lock)"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            old_watch, self._watch = self._watch, None
+            self._ready.clear()
+
+        # Unsubscribing can wait for the old watch's callback thread, which
+        # may be waiting on the lock; close it outside
+        if old_watch is not None:
+            try:
+                old_watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ Error closing product catalog listener: {e}")
+
+        with self._lock:
+            return self._start(generation)
+
+    def _start(self, generation):
+        """Open a watch for generation (caller holds the lock)"""
+        db = get_db_connection()
+        if db is None:
+            print("❌ Database connection failed in ProductCatalog")
+            return False
+
+        self._initial = True
+        self._watch = db.collection("products").on_snapshot(
+            lambda docs, changes, read_time: self._on_snapshot(generation, docs, changes, read_time)
+        )
+        print("👂 Product catalog listener started")
+        return True
+
+    def _on_snapshot(self, generation, docs, changes, read_time):
+        with self._lock:
+            if generation != self._generation:
+                return  # late callback from a watch that has been replaced
+            if self._initial:
+                # The first snapshot is the whole collection; rebuilding from it
+                # drops products deleted while the listener was down
+                self._products = {}
+                for doc in docs:
+                    self._put(doc.to_dict() or {})
+                self._initial = False
+            else:
+                for change in changes:
+                    data = change.document.to_dict() or {}
+                    if change.type.name == "REMOVED":
+                        self._products.pop(_key(data.get("sku")), None)
+                    else:
+                        self._put(data)
+            self._sku_list = None
+
+            print(f"👂 Product catalog: {len(changes)} changes, {len(self._products)} products")
+            self._ready.set()
+
+    def _put(self, data):
+        sku = data.get("sku")
+        if sku:
+            self._products[_key(sku)] = (sku, data.get("img_url"), data.get("party"))
+
+
+def _key(sku):
+    return str(sku).lower().strip()
+
+
+@st.cache_resource
+def get_product_catalog():
+    return ProductCatalog()
+
+
+def live_catalog():
+    """
+    Return the loaded catalog, or None while it is loading or could not be
+    started; callers then fall back to the TTL-cached Firestore reads.
+    """
+    catalog = get_product_catalog()
+    return catalog if catalog.ensure_running(wait=False) else None
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _stream_product_skus():
+    db = get_db_connection()
+    if db is None:
+        return []
+    skus = {doc.to_dict().get("sku") for doc in db.collection("products").select(["sku"]).stream()}
+    return sorted(sku for sku in skus if sku)
+
+
+def get_product_skus():
+    """Sorted product SKUs from the catalog (or a cached scan if it is unavailable)"""
+    catalog = live_catalog()
+    if catalog is not None:
+        return catalog.sku_list()
+    return _stream_product_skus()
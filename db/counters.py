@@ -0,0 +1,202 @@
+"""
+Sharded order counters per (party, status, day)
+
+Every order status change also increments/decrements a counter document in
+the same transaction or batch, so the dashboard can read a few counter
+documents instead of scanning orders. Counters are keyed by the day the order
+was last updated (UTC), matching the updated_at order window the rest of the
+app uses, and spread over COUNTER_SHARDS documents to avoid write contention
+on hot keys. A write that moves an order to a new day moves its count too.
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+
+from core.constants import ORDER_WINDOW_DAYS
+from db.firestore import get_db_connection
+from db.party_rules import get_party_rules_cache
+
+COUNTER_COLLECTION = "order_counters"
+COUNTER_META = ("meta", "order_counters")  # written by the reconcile job
+COUNTER_SHARDS = 4
+COUNTER_KEYED_BY = "updated_at"  # seeds from before this scheme are not trusted
+NO_PARTY = "NONE"
+
+
+def counter_day(updated_at):
+    """UTC day (YYYY-MM-DD) an order is counted under"""
+    if isinstance(updated_at, datetime):
+        if updated_at.tzinfo:
+            updated_at = updated_at.astimezone(timezone.utc)
+        return updated_at.strftime("%Y-%m-%d")
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def counter_key(party, status, updated_at):
+    return (party or NO_PARTY, str(status), counter_day(updated_at))
+
+
+def window_start(days=ORDER_WINDOW_DAYS):
+    """First counted day: today and the days - 1 before it"""
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+
+def party_resolver():
+    """Return a sku -> party function backed by the current party rules"""
+    return get_party_rules_cache().get()[1].party_of
+
+
+def transition_deltas(orders, new_status, party_of, now=None):
+    """
+    Counter deltas for writing orders with new_status and updated_at = now.
+
+    orders: iterable of order dicts with sku, status and updated_at as read
+    before the write. The order leaves its old (status, day) counter and
+    joins today's, so a write that keeps the status still moves the day.
+    """
+    now = now or datetime.utcnow()
+    deltas = Counter()
+    for order in orders:
+        party = party_of(order.get("sku", ""))
+        new_key = counter_key(party, new_status, now)
+        updated_at = order.get("updated_at")
+        if isinstance(updated_at, datetime) and order.get("status"):
+            old_key = counter_key(party, order["status"], updated_at)
+            if old_key == new_key:
+                continue
+            deltas[old_key] -= 1
+        deltas[new_key] += 1
+    return deltas
+
+
+def write_counter_deltas(writer, db, deltas):
+    """Queue counter increments on a Transaction or WriteBatch"""
+    collection = db.collection(COUNTER_COLLECTION)
+    for (party, status, day), delta in deltas.items():
+        if not delta:
+            continue
+        shard = random.randrange(COUNTER_SHARDS)
+        writer.set(
+            collection.document(f"{day}_{party}_{status}_{shard}"),
+            {
+                "party": party,
+                "status": status,
+                "day": day,
+                "shard": shard,
+                "count": firestore.Increment(delta),
+            },
+            merge=True,
+        )
+
+
+def counters_ready(db):
+    """Counters are only trusted once the reconcile job has seeded them"""
+    meta = db.collection(COUNTER_META[0]).document(COUNTER_META[1]).get()
+    return meta.exists and (meta.to_dict() or {}).get("keyed_by") == COUNTER_KEYED_BY
+
+
+def read_status_counts(party=None, days=ORDER_WINDOW_DAYS):
+    """
+    Sum counter shards per status for orders updated today or in the
+    `days` - 1 days before (the updated_at window, at day granularity).
+
+    Returns None when the database is unavailable or counters are not seeded.
+    """
+    db = get_db_connection()
+    if db is None:
+        return None
+
+    try:
+        if not counters_ready(db):
+            return None
+
+        since = window_start(days).strftime("%Y-%m-%d")
+        query = db.collection(COUNTER_COLLECTION).where("day", ">=", since)
+        if party:
+            query = query.where("party", "==", str(party).upper())
+
+        counts = Counter()
+        for doc in query.stream():
+            data = doc.to_dict()
+            counts[data.get("status")] += int(data.get("count", 0))
+        return dict(counts)
+    except Exception as e:
+        print(f"❌ Error reading order counters: {e}")
+        return None
+
+
+def reconcile_order_counters(days=ORDER_WINDOW_DAYS, apply=True):
+    """
+    Recompute counters from the orders collection and report drift.
+
+    Returns a list of {"party", "status", "day", "expected", "counted", "drift"}
+    for every key whose counter disagrees with the orders. With apply=True the
+    counters are rewritten (shard 0 holds the value, other shards are zeroed).
+    """
+    db = get_db_connection()
+    if db is None:
+        print("❌ Database connection failed in reconcile_order_counters")
+        return []
+
+    since_day = window_start(days)
+    since = datetime.combine(since_day, datetime.min.time())
+    party_of = party_resolver()
+
+    expected = Counter()
+    orders = db.collection("orders").where("updated_at", ">=", since).select(["sku", "status", "updated_at"])
+    for doc in orders.stream():
+        data = doc.to_dict()
+        expected[counter_key(party_of(data.get("sku", "")), data.get("status"), data.get("updated_at"))] += 1
+
+    counted = Counter()
+    shard_refs = {}
+    counters = db.collection(COUNTER_COLLECTION).where("day", ">=", since_day.strftime("%Y-%m-%d"))
+    for doc in counters.stream():
+        data = doc.to_dict()
+        key = (data.get("party"), data.get("status"), data.get("day"))
+        counted[key] += int(data.get("count", 0))
+        shard_refs.setdefault(key, []).append(doc.reference)
+
+    report = []
+    for key in sorted(set(expected) | set(counted)):
+        if expected[key] != counted[key]:
+            party, status, day = key
+            report.append({
+                "party": party,
+                "status": status,
+                "day": day,
+                "expected": expected[key],
+                "counted": counted[key],
+                "drift": counted[key] - expected[key],
+            })
+
+    if apply:
+        batch = db.batch()
+        ops = 0
+        collection = db.collection(COUNTER_COLLECTION)
+        for row in report:
+            key = (row["party"], row["status"], row["day"])
+            base_id = f"{row['day']}_{row['party']}_{row['status']}_0"
+            for ref in shard_refs.get(key, []):
+                if ref.id != base_id:
+                    batch.set(ref, {"count": 0}, merge=True)
+                    ops += 1
+            batch.set(
+                collection.document(base_id),
+                {"party": row["party"], "status": row["status"], "day": row["day"], "shard": 0, "count": row["expected"]},
+            )
+            ops += 1
+            if ops >= 450:
+                batch.commit()
+                batch = db.batch()
+                ops = 0
+        batch.set(
+            db.collection(COUNTER_META[0]).document(COUNTER_META[1]),
+            {"reconciled_at": datetime.utcnow(), "drifted_keys": len(report), "keyed_by": COUNTER_KEYED_BY},
+        )
+        batch.commit()
+
+    print(f"✅ Counter reconcile: {len(report)} drifted keys")
+    return report
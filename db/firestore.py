@@ -1,59 +1,153 @@
-from google.cloud import firestore
+"""
+Firestore connection management
+
+A single FirestoreConnectionManager is built per process (st.cache_resource)
+and owns the Firestore client. The client keeps its own gRPC channel, so every
+read and write in the app reuses the same channel instead of paying the setup
+cost on each call.
+"""
+import threading
+import time
+
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud import firestore_v1
 import streamlit as st
 
+HEALTH_CHECK_INTERVAL = 60  # seconds between liveness probes of the client
+RECONNECT_ATTEMPTS = 3
+RECONNECT_BASE_DELAY = 0.5  # seconds, doubled after every failed attempt
+RECONNECT_COOLDOWN = 10  # seconds to wait before retrying after all attempts fail
 
-def get_db_connection():
-    print("Connecting to Firestore database...")
-    
-    try:
-        # Check if secrets exist
+
+class FirestoreConnectionManager:
+    """Process-wide owner of the Firestore client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._last_health_check = 0.0
+        self._retry_after = 0.0
+        self.requested = 0
+        self.constructed = 0
+        self.reconnects = 0
+        self.health_failures = 0
+
+    def get_client(self):
+        """Return the shared client, (re)connecting only when needed."""
+        with self._lock:
+            self.requested += 1
+            client = self._client
+            probe = client is not None and self._health_check_due()
+            if probe:
+                # Claim this probe so concurrent callers keep using the client meanwhile
+                self._last_health_check = time.monotonic()
+
+        # The liveness probe is a network round trip; never hold the lock for it
+        if probe and not self._is_healthy(client):
+            print("⚠️ Firestore health check failed, reconnecting...")
+            with self._lock:
+                self.health_failures += 1
+                if self._client is client:
+                    self._client = None
+
+        with self._lock:
+            if self._client is None:
+                if time.monotonic() < self._retry_after:
+                    return None
+                reconnecting = self.constructed > 0
+                self._client = self._connect_with_backoff()
+                if self._client is not None and reconnecting:
+                    self.reconnects += 1
+
+            return self._client
+
+    def stats(self):
+        """Counters describing how the connection has been used."""
+        return {
+            "requested": self.requested,
+            "constructed": self.constructed,
+            "reconnects": self.reconnects,
+            "health_failures": self.health_failures,
+            "connected": self._client is not None,
+        }
+
+    def _health_check_due(self):
+        return time.monotonic() - self._last_health_check > HEALTH_CHECK_INTERVAL
+
+    @staticmethod
+    def _is_healthy(client):
+        try:
+            # Cheapest possible round trip: an empty, limited query
+            client.collection("_health").limit(1).get()
+            return True
+        except Exception as e:
+            print(f"❌ Firestore health check error: {e}")
+            return False
+
+    def _connect_with_backoff(self):
         if "firebase" not in st.secrets:
-            error_msg = "❌ Firebase secrets not found in st.secrets"
-            print(error_msg)
-            # st.error(error_msg)
+            print("❌ Firebase secrets not found in st.secrets")
+            self._retry_after = time.monotonic() + RECONNECT_COOLDOWN
             return None
-            
-        print("Firebase secrets found")
-        
-        firebase_credentials = dict(st.secrets["firebase"])  # Convert secrets to dict
 
-        # Initialize Firebase if not already initialized
+        delay = RECONNECT_BASE_DELAY
+        for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+            try:
+                client = self._build_client()
+                self._last_health_check = time.monotonic()
+                return client
+            except Exception as e:
+                print(f"❌ Error connecting to Firestore (attempt {attempt}/{RECONNECT_ATTEMPTS}): {e}")
+                if attempt < RECONNECT_ATTEMPTS:
+                    time.sleep(delay)
+                    delay *= 2
+
+        self._retry_after = time.monotonic() + RECONNECT_COOLDOWN
+        return None
+
+    def _build_client(self):
         if not firebase_admin._apps:
             print("Initializing Firebase app...")
-            cred = credentials.Certificate(firebase_credentials)  # Use dictionary directly
+            cred = credentials.Certificate(dict(st.secrets["firebase"]))
             firebase_admin.initialize_app(cred)
-            print("Firebase app initialized successfully")
+
+        if self.constructed == 0:
+            client = firestore.client()
         else:
-            print("Firebase app already initialized")
+            # firestore.client() would hand back the cached (unhealthy) client.
+            # Build a new one on a fresh channel and leave the Firebase app and
+            # the clients other modules hold (e.g. the order listener) alone.
+            app = firebase_admin.get_app()
+            client = firestore_v1.Client(project=app.project_id, credentials=app.credential.get_credential())
+        self.constructed += 1
+        print(f"✅ Firestore client created (constructed={self.constructed})")
+        return client
 
-        # Connect to Firestore
-        print("Creating Firestore client...")
-        db = firestore.client()
-        print("Firestore client created successfully")
-        return db
 
+@st.cache_resource
+def get_connection_manager():
+    return FirestoreConnectionManager()
+
+
+def get_db_connection():
+    """Return the process-wide Firestore client, or None if it is unavailable."""
+    try:
+        return get_connection_manager().get_client()
     except Exception as e:
-        error_msg = f"❌ Error connecting to Firestore: {e}"
-        print(error_msg)
-        # st.error(error_msg)
+        print(f"❌ Error connecting to Firestore: {e}")
         return None
 
 
+def get_connection_stats():
+    return get_connection_manager().stats()
+
+
 def init_database():
     """
-    Initialize the database with the required tables
+    Initialize the database connection for this process
     """
-    try:
-        # Connect to Firestore
-        print("Creating Firestore client...")
-        db = firestore.client()
-        print("Firestore client created successfully")
-        return db
-
-    except Exception as e:
-        error_msg = f"❌ Error connecting to Firestore: {e}"
-        print(error_msg)
-        # st.error(error_msg)
-        return None
+    db = get_db_connection()
+    if db is None:
+        print("❌ Error connecting to Firestore")
+    return db
@@ -0,0 +1,95 @@
+"""
+Short-lived SKU leases so pickers do not contend for the same SKU
+
+A picker holds the lease on the SKU whose card is on screen. Other pickers
+skip leased SKUs in their queue, so two update_orders_for_sku transactions on
+the same SKU rarely race. Leases carry an expires_at and simply stop counting
+once it passes; a Firestore TTL policy on expires_at can delete old documents.
+"""
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+import streamlit as st
+
+from core.constants import SKU_LEASE_SECONDS
+from db.firestore import get_db_connection
+
+LEASE_COLLECTION = "sku_leases"
+LEASE_REFRESH = 5  # seconds the active lease list is cached per process
+
+
+def _lease_ref(db, sku):
+    return db.collection(LEASE_COLLECTION).document(str(sku).replace("/", "_"))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def acquire_sku_lease(sku, holder, ttl=SKU_LEASE_SECONDS):
+    """
+    Take or renew the lease on sku for holder.
+
+    Returns True if holder now holds the lease, False if another holder's
+    lease is still active. Fails open (True) when Firestore is unavailable.
+    """
+    db = get_db_connection()
+    if db is None:
+        return True
+    ref = _lease_ref(db, sku)
+
+    @firestore.transactional
+    def claim(transaction):
+        snapshot = ref.get(transaction=transaction)
+        now = _now()
+        if snapshot.exists:
+            lease = snapshot.to_dict()
+            expires_at = lease.get("expires_at")
+            if lease.get("holder") != holder and expires_at and expires_at > now:
+                return False
+        transaction.set(ref, {
+            "sku": sku,
+            "holder": holder,
+            "expires_at": now + timedelta(seconds=ttl),
+        })
+        return True
+
+    try:
+        return claim(db.transaction())
+    except Exception as e:
+        print(f"❌ Error acquiring lease for SKU={sku}: {e}")
+        return True
+
+
+def release_sku_lease(sku, holder):
+    """Drop holder's lease on sku; leases held by others are left alone"""
+    db = get_db_connection()
+    if db is None:
+        return
+    ref = _lease_ref(db, sku)
+
+    @firestore.transactional
+    def release(transaction):
+        snapshot = ref.get(transaction=transaction)
+        if snapshot.exists and snapshot.to_dict().get("holder") == holder:
+            transaction.delete(ref)
+
+    try:
+        release(db.transaction())
+    except Exception as e:
+        print(f"❌ Error releasing lease for SKU={sku}: {e}")
+
+
+@st.cache_data(ttl=LEASE_REFRESH, show_spinner=False)
+def active_leases():
+    """{sku: holder} for every lease that has not expired"""
+    db = get_db_connection()
+    if db is None:
+        return {}
+    docs = db.collection(LEASE_COLLECTION).where("expires_at", ">", _now()).stream()
+    return {doc.get("sku"): doc.get("holder") for doc in docs}
+
+
+def leased_skus(holder):
+    """SKUs currently leased to someone other than holder"""
+    return {sku for sku, lease_holder in active_leases().items() if lease_holder != holder}
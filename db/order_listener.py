@@ -0,0 +1,123 @@
+"""
+Firestore on_snapshot listener that keeps the shared order store live
+"""
+import threading
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from core.constants import ORDER_WINDOW_DAYS
+from db.firestore import get_db_connection
+from db.order_store import get_order_store
+
+INITIAL_SNAPSHOT_TIMEOUT = 15  # seconds to wait for the first snapshot
+LISTENER_REANCHOR_AFTER = timedelta(days=1)  # restart so the query window keeps moving
+
+
+class OrderListener:
+    """
+    Watches orders updated in the last ORDER_WINDOW_DAYS days.
+
+    Firestore pushes only changed documents after the initial snapshot, which
+    are applied to the shared OrderStore, so every session reads the same
+    up-to-date table without issuing queries.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()  # one restart at a time
+        self._store = store
+        self._watch = None
+        self._started_at = None
+        self._initial = True
+        self._generation = 0  # bumped per watch; callbacks of older watches are dropped
+        self._ready = threading.Event()
+        self.restarts = 0
+
+    def ensure_running(self, wait=True):
+        """
+        Start (or restart) the listener; return True once it is live.
+
+        wait=False returns at once, False while the initial snapshot of a new
+        or re-anchored watch is still loading, so page renders never block.
+        """
+        with self._restart_lock:
+            with self._lock:
+                stale = self._started_at and datetime.utcnow() - self._started_at > LISTENER_REANCHOR_AFTER
+                needs_start = self._watch is None or not self._watch.is_active or stale
+            started = self._restart() if needs_start else True
+        if not wait:
+            return started and self._ready.is_set()
+        return started and self._ready.wait(timeout=INITIAL_SNAPSHOT_TIMEOUT)
+
+    def restart(self):
+        with self._restart_lock:
+            started = self._restart()
+        return started and self._ready.wait(timeout=INITIAL_SNAPSHOT_TIMEOUT)
+
+    def _restart(self):
+        """Close the current watch, then open a new one (caller holds _restart_lock)"""
+        with self._lock:
+            # From here on callbacks of the old watch are stale and ignored
+            self._generation += 1
+            generation = self._generation
+            old_watch, self._watch = self._watch, None
+            self._ready.clear()
+
+        # Unsubscribing can wait for the old watch's callback thread, which
+        # may be waiting on the lock; close it outside
+        self._close(old_watch)
+
+        with self._lock:
+            if old_watch is not None:
+                self.restarts += 1
+            return self._start(generation)
+
+    def _start(self, generation):
+        """Open a watch for generation (caller holds the lock)"""
+        db = get_db_connection()
+        if db is None:
+            print("❌ Database connection failed in OrderListener")
+            return False
+
+        self._initial = True
+        self._started_at = datetime.utcnow()
+        since = self._started_at - timedelta(days=ORDER_WINDOW_DAYS)
+        query = db.collection("orders").where("updated_at", ">=", since)
+        self._watch = query.on_snapshot(
+            lambda docs, changes, read_time: self._on_snapshot(generation, docs, changes, read_time)
+        )
+        print(f"👂 Order listener started (since {since})")
+        return True
+
+    @staticmethod
+    def _close(watch):
+        if watch is None:
+            return
+        try:
+            watch.unsubscribe()
+        except Exception as e:
+            print(f"⚠️ Error closing order listener: {e}")
+
+    def _on_snapshot(self, generation, docs, changes, read_time):
+        with self._lock:
+            if generation != self._generation:
+                return  # late callback from a watch that has been replaced
+            if self._initial:
+                # The first snapshot is the full window; it also clears anything
+                # deleted while the listener was down
+                self._store.replace(docs)
+                self._initial = False
+                print(f"👂 Order listener: initial snapshot of {len(docs)} orders")
+            else:
+                upserts = [c.document for c in changes if c.type.name in ("ADDED", "MODIFIED")]
+                removed = [c.document.id for c in changes if c.type.name == "REMOVED"]
+                self._store.apply_changes(upserts, removed)
+                print(f"👂 Order listener: {len(upserts)} changed, {len(removed)} removed")
+
+            self._ready.set()
+
+
+@st.cache_resource
+def get_order_listener():
+    return OrderListener(get_order_store())
@@ -0,0 +1,87 @@
+"""
+Typed schema for the in-memory order table
+
+Low-cardinality text columns are categoricals, dispatch_date is a real date
+(datetime64) and quantity is int32. A party column is derived from the SKU
+once per distinct SKU. Frames handed to sessions are read-only, so filters
+should select with boolean masks and never copy the whole table first.
+"""
+import pandas as pd
+
+CATEGORY_COLUMNS = ("status", "platform", "party", "picked_by", "validated_by")
+DISPATCH_DATE_FORMAT = "%d-%m-%Y"  # how ingest stores dispatch_date and how it is shown
+
+
+def parse_dispatch_dates(values):
+    """Dispatch dates (DD-MM-YYYY strings or timestamps) as naive datetime64"""
+    values = pd.Series(values)
+    parsed = pd.to_datetime(values, format=DISPATCH_DATE_FORMAT, errors="coerce")
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        fallback = pd.to_datetime(values[retry], errors="coerce", utc=True).dt.tz_convert(None)
+        parsed = parsed.where(~retry, fallback.dt.normalize())
+    return parsed.astype("datetime64[ns]")
+
+
+def format_dispatch_date(value):
+    """Display form of a dispatch date"""
+    if isinstance(value, pd.Timestamp):
+        return value.strftime(DISPATCH_DATE_FORMAT)
+    return value
+
+
+def typed_orders(df, party_of=None):
+    """
+    Return df with the order table dtypes applied.
+
+    party_of maps a SKU to its party name; when given, the party column is
+    (re)derived for every distinct SKU.
+    """
+    if df is None or df.empty:
+        return df if df is not None else pd.DataFrame()
+
+    df = df.copy(deep=False)
+    if "dispatch_date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["dispatch_date"]):
+        df["dispatch_date"] = parse_dispatch_dates(df["dispatch_date"]).to_numpy()
+    if "quantity" in df.columns and df["quantity"].dtype != "int32":
+        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0).astype("int32")
+    if party_of is not None and "sku" in df.columns:
+        parties = {sku: party_of(sku) or "" for sku in df["sku"].dropna().unique()}
+        df["party"] = df["sku"].map(parties)
+
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def assign_where(series, mask, value):
+    """Copy of series with value set where mask holds, growing categories as needed"""
+    series = series.copy()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if pd.notna(value) and value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+    elif series.name == "dispatch_date" and pd.api.types.is_datetime64_any_dtype(series):
+        value = parse_dispatch_dates([value]).iloc[0]
+    series[mask] = value
+    return series
+
+
+def concat_orders(frames):
+    """Concatenate order frames, keeping categoricals instead of falling back to object"""
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    combined = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in combined.columns and not isinstance(combined[column].dtype, pd.CategoricalDtype):
+            combined[column] = combined[column].astype("category")
+    return combined
+
+
+def memory_usage_mb(df):
+    """Deep memory footprint of a frame in MiB"""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
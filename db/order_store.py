@@ -0,0 +1,185 @@
+"""
+Shared, versioned order table for every session in the process
+"""
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from db.order_schema import assign_where
+from db.order_sync import OrderSyncEngine, order_records
+from db.sku_index import SkuAggregateIndex
+from db.party_rules import get_party_rules_cache
+
+# Patching any of these fields moves orders between SKU aggregate cells
+INDEXED_FIELDS = {"status", "sku", "dispatch_date", "quantity"}
+
+
+class OrderStore:
+    """
+    One read-only order table per process.
+
+    Sessions hold references to the current frame instead of copies. Every
+    change (listener push, polling sync, local patch) builds a new frame and
+    bumps the version, so frames already handed out are never mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = None
+        self._matcher = None
+        self._table = OrderSyncEngine(self._party_of)
+        self._index = None
+        self._polled_at = 0.0
+        self.version = 0
+
+    def _load_rules(self):
+        """Party rules the table is typed with (callers hold the lock)"""
+        if self._matcher is None:
+            self._rules, self._matcher = get_party_rules_cache().get()
+        return self._rules
+
+    def _party_of(self, sku):
+        self._load_rules()
+        return self._matcher.party_of(sku)
+
+    def _parties_of(self, sku):
+        self._load_rules()
+        return self._matcher.parties_of(sku)
+
+    def _drop_party_state(self):
+        """Forget party-derived state and re-derive the party column (callers hold the lock)"""
+        self._rules = None
+        self._matcher = None
+        self._index = None
+        if not self._table.df.empty:
+            self._table.retype()
+            self.version += 1
+
+    @property
+    def loaded(self):
+        return self.version > 0
+
+    def snapshot(self):
+        """Return the current frame (treat as read-only) and its version"""
+        with self._lock:
+            return self._table.df, self.version
+
+    def sync(self, full=False):
+        """Poll Firestore for changes when no listener is feeding the store"""
+        with self._lock:
+            self._table.sync(full=full)
+            self._polled_at = time.monotonic()
+            self._index = None
+            self.version += 1
+
+    def poll(self, interval):
+        """Delta sync at most once per interval seconds; return True if the table changed"""
+        with self._lock:
+            if self.loaded and time.monotonic() - self._polled_at < interval:
+                return False
+            before = self._table.df
+            self._table.sync()
+            self._polled_at = time.monotonic()
+            if self.loaded and self._table.df is before:
+                return False
+            self._index = None
+            self.version += 1
+            return True
+
+    def replace(self, docs):
+        """Replace the whole table with a full result set"""
+        with self._lock:
+            self._table = OrderSyncEngine(self._party_of)
+            self._table.merge_records(order_records(docs))
+            self._index = None
+            self.version += 1
+
+    def apply_changes(self, upserts, removed_ids):
+        """Merge changed documents and drop removed ones"""
+        records = order_records(upserts)
+        with self._lock:
+            df = self._table.df
+            changed_ids = [r["order_id"] for r in records]
+            before = df[df["order_id"].isin(changed_ids)] if not df.empty else None
+
+            self._table.merge_records(records)
+            removed = self._table.remove_ids(removed_ids)
+            expired = self._table._prune_window()
+
+            if self._index is not None:
+                self._index.apply(before, self._table.frame(records))
+                self._index.apply(removed, None)
+                self._index.apply(expired, None)
+            self.version += 1
+
+    def reconcile(self, sku, status, docs):
+        """
+        Make the cached rows of one SKU in one status match an authoritative read.
+
+        docs are every order of sku in status. Cached rows not among them have
+        moved on; they are dropped and come back with their new status on the
+        next listener push or delta sync.
+        """
+        records = order_records(docs)
+        fresh_ids = [r["order_id"] for r in records]
+        with self._lock:
+            df = self._table.df
+            if df.empty:
+                before, stale_ids = None, []
+            else:
+                before = df[df["order_id"].isin(fresh_ids)]
+                stale = (df["sku"] == sku) & (df["status"] == status) & ~df["order_id"].isin(fresh_ids)
+                stale_ids = df.loc[stale, "order_id"].tolist()
+
+            self._table.merge_records(records, advance=False)
+            removed = self._table.remove_ids(stale_ids)
+
+            if self._index is not None:
+                self._index.apply(before, self._table.frame(records))
+                self._index.apply(removed, None)
+            self.version += 1
+
+    def sku_groups(self, status, party):
+        """Grouped SKU queue for a status and party, served from the aggregate index"""
+        rules_matcher = get_party_rules_cache().get()[1]
+        with self._lock:
+            if self._matcher is not None and rules_matcher is not self._matcher:
+                # Rules changed in another process or session
+                self._drop_party_state()
+            if self._index is None:
+                self._index = SkuAggregateIndex.build(self._table.df, self._parties_of, self._load_rules().keys())
+            return self._index.groups(status, party)
+
+    def invalidate_index(self):
+        """Drop party-derived state after party rules changed"""
+        with self._lock:
+            self._drop_party_state()
+
+    def patch(self, order_ids, fields):
+        """Set fields on the given orders (copy-on-write, only touched columns are copied)"""
+        if not order_ids or not fields:
+            return
+
+        with self._lock:
+            df = self._table.df
+            if df.empty:
+                return
+
+            patched = df.copy(deep=False)
+            mask = patched["order_id"].isin(order_ids)
+            for column, value in fields.items():
+                series = patched[column] if column in patched.columns else pd.Series(None, index=patched.index, dtype=object, name=column)
+                patched[column] = assign_where(series, mask, value)
+
+            if self._index is not None and not INDEXED_FIELDS.isdisjoint(fields):
+                self._index.apply(df[mask], patched[mask])
+
+            self._table.df = patched
+            self.version += 1
+
+
+@st.cache_resource
+def get_order_store():
+    return OrderStore()
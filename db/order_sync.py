@@ -0,0 +1,140 @@
+"""
+Incremental (delta) sync of the working order set from Firestore
+"""
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from core.constants import ORDER_WINDOW_DAYS
+from db.firestore import get_db_connection
+from db.order_schema import concat_orders, typed_orders
+
+# Re-read a small overlap before the high-water mark so writes stamped with a
+# slightly skewed client clock are not missed. Merging is idempotent.
+SYNC_OVERLAP = timedelta(minutes=2)
+
+
+def order_records(docs):
+    """Convert order snapshots to the row dicts used by orders_df"""
+    return [{**doc.to_dict(), "order_id": doc.id} for doc in docs]
+
+
+class OrderSyncEngine:
+    """
+    Keeps a DataFrame of orders updated in the last ORDER_WINDOW_DAYS days.
+
+    The first sync (or an explicit full sync) scans the whole window; later
+    syncs only fetch orders whose updated_at is past the high-water mark and
+    merge them into the frame by order_id. Rows are kept in the typed schema
+    of db.order_schema; party_of (sku -> party) fills the party column.
+    """
+
+    def __init__(self, party_of=None):
+        self.party_of = party_of
+        self.df = pd.DataFrame()
+        self.high_water_mark = None
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.docs_read = 0
+
+    def sync(self, full=False):
+        """Bring the frame up to date and return it"""
+        db = get_db_connection()
+        if db is None:
+            print("❌ Database connection failed in OrderSyncEngine.sync")
+            return self.df
+
+        try:
+            if full or self.high_water_mark is None:
+                self._full_sync(db)
+            else:
+                self._delta_sync(db)
+        except Exception as e:
+            print(f"❌ Error syncing orders: {e}")
+
+        return self.df
+
+    def _full_sync(self, db):
+        since = datetime.utcnow() - timedelta(days=ORDER_WINDOW_DAYS)
+        docs = list(db.collection("orders").where("updated_at", ">=", since).stream())
+
+        records = order_records(docs)
+        self.df = self.frame(records)
+        self.high_water_mark = self._max_updated_at(records) or since
+        self.full_syncs += 1
+        self.docs_read += len(docs)
+        print(f"✅ Full order sync: {len(docs)} orders")
+
+    def _delta_sync(self, db):
+        since = self.high_water_mark - SYNC_OVERLAP
+        docs = list(db.collection("orders").where("updated_at", ">", since).stream())
+
+        self.merge_records(order_records(docs))
+        self._prune_window()
+        self.delta_syncs += 1
+        self.docs_read += len(docs)
+        print(f"✅ Delta order sync: {len(docs)} changed orders")
+
+    def merge_records(self, records, advance=True):
+        """
+        Upsert order rows into the frame by order_id.
+
+        advance=False leaves the high-water mark alone, for rows read outside
+        a sync that must not make the next delta sync skip other changes.
+        """
+        if not records:
+            return
+
+        updates = self.frame(records)
+        if self.df.empty:
+            self.df = updates
+        else:
+            unchanged = self.df[~self.df["order_id"].isin(updates["order_id"])]
+            self.df = concat_orders([unchanged, updates])
+
+        latest = self._max_updated_at(records) if advance else None
+        if latest is not None and (self.high_water_mark is None or latest > self.high_water_mark):
+            self.high_water_mark = latest
+
+    def frame(self, records):
+        """Typed order frame for row dicts"""
+        return typed_orders(pd.DataFrame(records), self.party_of) if records else pd.DataFrame()
+
+    def retype(self):
+        """Re-derive the party column, e.g. after party rules changed"""
+        self.df = typed_orders(self.df, self.party_of)
+
+    def remove_ids(self, order_ids):
+        """Drop orders by id (deleted documents); return the dropped rows"""
+        if self.df.empty or not order_ids:
+            return None
+        removed = self.df["order_id"].isin(order_ids)
+        dropped = self.df[removed]
+        self.df = self.df[~removed].reset_index(drop=True)
+        return dropped
+
+    def _prune_window(self):
+        """Drop orders that have aged out of the window; return the dropped rows"""
+        if self.df.empty or "updated_at" not in self.df.columns:
+            return None
+
+        cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=ORDER_WINDOW_DAYS)
+        updated_at = pd.to_datetime(self.df["updated_at"], utc=True, errors="coerce")
+        expired = updated_at.notna() & (updated_at < cutoff)
+        if not expired.any():
+            return None
+
+        dropped = self.df[expired]
+        self.df = self.df[~expired].reset_index(drop=True)
+        return dropped
+
+    @staticmethod
+    def _max_updated_at(records):
+        # Firestore returns timezone-aware timestamps; keep the mark as naive UTC
+        # like the datetime.utcnow() values used in queries
+        stamps = [
+            stamp.astimezone(timezone.utc).replace(tzinfo=None) if stamp.tzinfo else stamp
+            for stamp in (r.get("updated_at") for r in records)
+            if isinstance(stamp, datetime)
+        ]
+        return max(stamps) if stamps else None
@@ -2,26 +2,170 @@
 Order management functions for Firestore database
 """
 import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from core.cache import TTLCache
+from core.constants import ORDER_LISTENER_ENABLED, ORDER_POLL_SECONDS, ORDER_WINDOW_DAYS
+from db.aggregations import aggregate_status_counts
+from db.allocation import DEFAULT_STRATEGY, Candidate, allocate, allocate_by_date
+from db.catalog import live_catalog
+from db.counters import counter_key, party_resolver, read_status_counts, transition_deltas, write_counter_deltas
 from db.firestore import get_db_connection
+from db.order_listener import get_order_listener
+from db.order_schema import format_dispatch_date
+from db.party_stamp import party_field
+from db.write_pipeline import WriteGroup, WritePipeline, tally
+from db.order_store import get_order_store
 from datetime import datetime, timedelta
 from firebase_admin import firestore
 import pandas as pd
 import streamlit as st
 import time
 
+def _live_listener():
+    """Return the live order listener, or None to fall back to polling (never waits for a snapshot)"""
+    if not ORDER_LISTENER_ENABLED:
+        return None
+    listener = get_order_listener()
+    return listener if listener.ensure_running(wait=False) else None
+
+def _attach_orders(store):
+    """Point this session's orders_df at the store's current frame (no copy)"""
+    df, version = store.snapshot()
+    st.session_state.orders_df = df
+    st.session_state.orders_version = version
+    return df
+
+def sync_orders(full=False):
+    """
+    Refresh the shared order table and this session's view of it.
+
+    With the order listener running the table is already live. Otherwise
+    only orders changed since the last sync are fetched; the whole 7-day
+    window is scanned on cold start or when full=True.
+    """
+    store = get_order_store()
+    listener = _live_listener()
+    if listener is not None:
+        if full:
+            listener.restart()
+    else:
+        store.sync(full=full)
+    return _attach_orders(store)
+
 def load_orders(force=False):
-    """Load orders into session state safely"""
-    if force or "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()
+    """
+    Load orders into session state, refreshing when the shared table has changed.
+
+    Without a live listener the shared table is delta-synced at most every
+    ORDER_POLL_SECONDS, so sessions keep seeing other users' changes.
+    """
+    store = get_order_store()
+    if force:
+        return sync_orders()
+    if _live_listener() is None:
+        store.poll(ORDER_POLL_SECONDS)
+
+    if "orders_df" not in st.session_state or st.session_state.get("orders_version") != store.version:
+        _attach_orders(store)
+    return st.session_state.orders_df
+
+def get_sku_groups(status, party="Both"):
+    """Grouped SKU queue for a status and party from the shared aggregate index"""
+    return get_order_store().sku_groups(status, party)
+
+def patch_orders(order_ids, fields):
+    """Apply a local change to the shared order table; the only write path for the cache"""
+    store = get_order_store()
+    store.patch(order_ids, fields)
+    _attach_orders(store)
+
+def reconcile_sku_orders(sku, status, docs):
+    """Replace the cached rows of one SKU/status with a snapshot read in a transaction"""
+    store = get_order_store()
+    store.reconcile(sku, status, docs)
+    _attach_orders(store)
+
+INGEST_CHUNK_SIZE = 400  # documents per existence check
+INGEST_WORKERS = 4  # chunks checked in parallel
+INGEST_STALL_FLUSH = 0.5  # seconds without progress before the open write batch is sent early
+
+
+def _new_order_doc(row, platform, now, party_of):
+    sku = str(row["sku"]).upper()
+    return {
+        "sku": sku,
+        "party": party_field(party_of(sku)),
+        "quantity": int(row["quantity"]),
+        "status": "new",  # Default status
+        "picked_by": "",
+        "validated_by": "",
+        "platform": platform,
+        "created_at": now,
+        "updated_at": now,
+        "dispatch_date": row["dispatch_date"] if pd.notna(row["dispatch_date"]) else None
+    }
+
+
+def _ingest_chunk(db, pipeline, index, rows, platform, party_of):
+    """
+    Check existence of a chunk with one get_all and queue its new orders on the write pipeline.
 
-def add_orders_to_db(orders_df, platform):
+    Returns (report, write futures); tally() fills in added/failed once they land.
+    """
+    orders_ref = db.collection("orders")
+    refs = [orders_ref.document(str(row["order_id"])) for row in rows]
+    report = {"chunk": index, "rows": len(rows), "added": 0, "skipped": 0, "failed": 0}
+
+    try:
+        existing = {snap.id for snap in db.get_all(refs) if snap.exists}
+    except Exception as e:
+        print(f"❌ Chunk {index} failed: {e}")
+        report["failed"] = len(rows)
+        return report, []
+    report["skipped"] = len(existing)
+
+    now = datetime.utcnow()
+    writes = []
+    for ref, row in zip(refs, rows):
+        if ref.id in existing:
+            continue
+        order = _new_order_doc(row, platform, now, party_of)
+        group = WriteGroup(key=ref.id, deltas={counter_key(party_of(order["sku"]), "new", now): 1})
+        writes.append(pipeline.submit(group.set(ref, order)))
+    return report, writes
+
+
+def add_orders_to_db(orders_df, platform, on_chunk=None):
     """
     Add new orders to the database
-    
+
+    Rows are split into chunks; each chunk checks existence with a single
+    get_all and queues its new orders on the shared write pipeline.
+
     Args:
         orders_df: DataFrame containing order data
         platform: Name of the platform (e.g., 'flipkart', 'meesho')
-    
+        on_chunk: Optional callback receiving each chunk report
+            ({"chunk", "rows", "added", "skipped", "failed"})
+
+    Returns:
+        Tuple of (success boolean, count of orders added)
+    """
+    # A document can only be written once per batch; the last row for an order wins
+    orders_df = orders_df.drop_duplicates(subset="order_id", keep="last")
+    return add_order_batches([orders_df], platform, on_chunk=on_chunk)
+
+def add_order_batches(batches, platform, on_chunk=None, skip_chunks=()):
+    """
+    Write a stream of order DataFrames as they arrive.
+
+    Each batch is cut into INGEST_CHUNK_SIZE chunks and submitted to the
+    writer pool right away, so the first commit happens while the rest of the
+    file is still being parsed. At most INGEST_WORKERS * 2 chunks are in
+    flight; reading waits for writers beyond that. An order id seen earlier
+    in the stream is skipped. Chunk numbering is deterministic for the same
+    input, so skip_chunks (indexes already committed) lets a retry resume.
+
     Returns:
         Tuple of (success boolean, count of orders added)
     """
@@ -30,47 +174,59 @@ def add_orders_to_db(orders_df, platform):
         print("Database connection failed.")
         return False, 0
 
-    batch = db.batch()  # Create a batch write object
-    added_count = 0  # Track only successfully added orders
+    party_of = party_resolver()
+    seen_ids = set()
+    totals = {"added": 0, "failed": 0}
+    checking, writing = set(), set()  # chunks reading existence / chunks waiting on their writes
 
-    try:
-        for _, row in orders_df.iterrows():
-            order_id = str(row["order_id"])
-            doc_ref = db.collection("orders").document(order_id)
-            # Skip if order already exists (check from our local set)
-            doc_snapshot = doc_ref.get()
-            if doc_snapshot.exists:
+    def collect(report):
+        print(
+            f"📦 Chunk {report['chunk']}: added={report['added']} "
+            f"skipped={report['skipped']} failed={report['failed']}"
+        )
+        totals["added"] += report["added"]
+        totals["failed"] += report["failed"]
+        if on_chunk:
+            on_chunk(report)
+
+    def advance(futures):
+        for future in futures:
+            if future in checking:
+                checking.discard(future)
+                writing.add(tally(*future.result(), ok_key="added"))
+            else:
+                writing.discard(future)
+                collect(future.result())
+
+    chunk_index = 0
+    pipeline = WritePipeline(db, "ingest")
+    with pipeline, ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+        for batch in batches:
+            if batch is None or batch.empty:
                 continue
-
-            # Add order to batch
-            batch.set(doc_ref, {
-                "sku": row["sku"].upper(),
-                "quantity": row["quantity"],
-                "status": "new",  # Default status
-                "picked_by": "",
-                "validated_by": "",
-                "platform": platform,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-                "dispatch_date": row["dispatch_date"] if pd.notna(row["dispatch_date"]) else None
-            })
-            added_count += 1  # Increment only when added
-
-            # Firestore allows a maximum of 500 operations per batch
-            if added_count % 500 == 0:
-                batch.commit()  # Commit the batch every 500 inserts
-                batch = db.batch()  # Start a new batch
-
-        # Commit any remaining writes
-        batch.commit()
-
-        st.session_state.orders_df = get_orders_from_db()
-
-        return True, added_count  # Return count of successfully inserted orders
-
-    except Exception as e:
-        print(f"Database error: {e}")
-        return False, added_count
+            batch = batch[~batch["order_id"].isin(seen_ids)].drop_duplicates(subset="order_id")
+            seen_ids.update(batch["order_id"])
+            rows = batch.to_dict("records")
+
+            for start in range(0, len(rows), INGEST_CHUNK_SIZE):
+                if chunk_index in skip_chunks:
+                    chunk_index += 1
+                    continue
+                while len(checking) + len(writing) >= INGEST_WORKERS * 2:
+                    done, _ = wait(checking | writing, timeout=INGEST_STALL_FLUSH, return_when=FIRST_COMPLETED)
+                    if not done:
+                        # Every chunk in flight waits on the open, half-full batch
+                        pipeline.flush()
+                    advance(done)
+                chunk = rows[start:start + INGEST_CHUNK_SIZE]
+                checking.add(executor.submit(_ingest_chunk, db, pipeline, chunk_index, chunk, platform, party_of))
+                chunk_index += 1
+
+        advance(wait(checking).done)
+        pipeline.flush()  # once, after every chunk has queued its writes
+        advance(as_completed(list(writing)))
+
+    return totals["failed"] == 0, totals["added"]
 
 def get_orders_from_db(status=None):
     
@@ -82,7 +238,7 @@ def get_orders_from_db(status=None):
         return pd.DataFrame()
     
     orders_ref = db.collection("orders")
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    seven_days_ago = datetime.utcnow() - timedelta(days=ORDER_WINDOW_DAYS)
 
     try:
         # print(f"🔍 DEBUG: Querying orders from last 7 days (since {seven_days_ago})")
@@ -164,57 +320,133 @@ def update_status(order_id,status, platform, where=None):
                     "timestamp": datetime.utcnow()
                 })
                 return
-        orders_ref.update({"status": status, "updated_at": datetime.utcnow(), "validated_by": platform})
+        batch = db.batch()
+        batch.update(orders_ref, {"status": status, "updated_at": datetime.utcnow(), "validated_by": platform})
+        write_counter_deltas(batch, db, transition_deltas([order_data], status, party_resolver()))
+        batch.commit()
         print(f"✅ Order {order_id} {status}.")
     else:
         print(f"⚠️ Order {order_id} not found in Firestore.")
 
-def bulk_update_status(cancelled_df: pd.DataFrame, platform: str):
+def update_order_fields(order_id, fields):
+    """
+    Update one order and move its status counters in the same transaction.
+
+    The counter transition is computed from the order as read inside the
+    transaction, so a change made since the caller last looked is respected.
+    """
     db = get_db_connection()
-    if db is None:
-        return
+    order_ref = db.collection("orders").document(order_id)
+    transaction = db.transaction()
+    party_of = party_resolver()
 
-    BATCH_LIMIT = 500
-    batch = db.batch()
-    op_count = 0
+    @firestore.transactional
+    def process(transaction):
+        snap = order_ref.get(transaction=transaction)
+        if not snap.exists:
+            raise ValueError(f"Order {order_id} not found")
+        current = snap.to_dict()
+        now = datetime.utcnow()
+        transaction.update(order_ref, {**fields, "updated_at": now})
+        new_status = fields.get("status", current.get("status"))
+        write_counter_deltas(transaction, db, transition_deltas([current], new_status, party_of, now))
 
-    for _, row in cancelled_df.iterrows():
-        order_id = str(row.iloc[1]).strip()
-        status = str(row.iloc[0]).strip().lower()
+    process(transaction)
 
-        if not order_id:
-            continue
+STATUS_UPDATE_CHUNK_SIZE = 400  # order ids per get_all
+STATUS_UPDATE_WORKERS = 4
 
-        order_ref = db.collection("orders").document(order_id)
 
-        batch.set(
-            order_ref,
-            {
-                "status": status,
-                "updated_at": datetime.utcnow(),
-                "validated_by": platform
-            },
-            merge=True  # 👈 no read required
-        )
+def _status_diff(updates_df):
+    """{order_id: status} from a platform status file; the last row for an id wins"""
+    ids = updates_df.iloc[:, 1].astype(str).str.strip()
+    statuses = updates_df.iloc[:, 0].astype(str).str.strip().str.lower()
+    keep = ids != ""
+    return dict(zip(ids[keep], statuses[keep]))
 
-        op_count += 1
 
-        # Commit every 500 writes
-        if op_count == BATCH_LIMIT:
-            batch.commit()
-            batch = db.batch()
-            op_count = 0
+def _status_chunk(db, pipeline, index, chunk, platform, party_of):
+    """
+    Read one chunk with get_all and queue only the orders whose status really moves.
 
-    # Commit remaining writes
-    if op_count > 0:
-        batch.commit()
+    Returns (report, write futures); tally() fills in changed/failed once they land.
+    """
+    orders_ref = db.collection("orders")
+    refs = [orders_ref.document(order_id) for order_id, _ in chunk]
+    report = {"chunk": index, "changed": 0, "unchanged": 0, "unknown": 0, "failed": 0}
+
+    try:
+        current = {snap.id: snap.to_dict() for snap in db.get_all(refs) if snap.exists}
+    except Exception as e:
+        print(f"❌ Status chunk {index} failed: {e}")
+        report["failed"] = len(chunk)
+        return report, []
+
+    now = datetime.utcnow()
+    writes = []
+    for ref, (order_id, status) in zip(refs, chunk):
+        order = current.get(order_id)
+        if order is None:
+            report["unknown"] += 1
+            continue
+        if order.get("status") == status:
+            report["unchanged"] += 1
+            continue
+        # update (not set) so an order deleted meanwhile is never recreated as a stub
+        group = WriteGroup(key=order_id, deltas=transition_deltas([order], status, party_of, now))
+        writes.append(pipeline.submit(
+            group.update(ref, {"status": status, "updated_at": now, "validated_by": platform})
+        ))
+    return report, writes
 
-    print("✅ Bulk status update completed")
+
+def bulk_update_status(cancelled_df: pd.DataFrame, platform: str):
+    """
+    Apply the statuses of a platform file (column 0 status, column 1 order id).
+
+    Current statuses are read with one get_all per chunk; orders we do not
+    know are skipped and orders already in that status are not written, so
+    a typical daily file commits only the few rows that really changed.
+    Writes go through the shared write pipeline; each order's update lands
+    atomically with its counter moves.
+
+    Returns:
+        Dict with changed, unchanged, unknown and failed counts
+    """
+    totals = {"changed": 0, "unchanged": 0, "unknown": 0, "failed": 0}
+    db = get_db_connection()
+    if db is None:
+        return totals
+
+    party_of = party_resolver()
+    updates = list(_status_diff(cancelled_df).items())
+    chunks = [updates[start:start + STATUS_UPDATE_CHUNK_SIZE]
+              for start in range(0, len(updates), STATUS_UPDATE_CHUNK_SIZE)]
+
+    pipeline = WritePipeline(db, "status")
+    with pipeline, ThreadPoolExecutor(max_workers=STATUS_UPDATE_WORKERS) as executor:
+        checks = [executor.submit(_status_chunk, db, pipeline, i, chunk, platform, party_of)
+                  for i, chunk in enumerate(chunks)]
+        reports = [tally(*check.result(), ok_key="changed") for check in checks]
+        pipeline.flush()  # once, after every chunk has queued its writes
+        for future in as_completed(reports):
+            report = future.result()
+            for key in totals:
+                totals[key] += report[key]
+
+    print(
+        f"✅ Bulk status update: changed={totals['changed']} unchanged={totals['unchanged']} "
+        f"unknown={totals['unknown']} failed={totals['failed']}"
+    )
+    return totals
 
 
 def get_orders_grouped_by_sku(orders_df, status=None):
     """
     Groups orders by SKU and dispatch date, ensuring earliest dispatch orders come first.
+
+    Vectorized: one groupby on (sku, dispatch_date) and one aggregation per SKU
+    that collects the per-date rows into dispatch_breakdown.
     """
 
     try:
@@ -222,46 +454,38 @@ def get_orders_grouped_by_sku(orders_df, status=None):
             print("⚠️ Warning: orders_df is empty before processing.")
             return pd.DataFrame()
 
-        # Create a working copy
-        orders_df = orders_df.copy()
-
-        # print("Raw dispatch_date values:", orders_df["dispatch_date"].head(5).tolist())
-
-        # Convert dispatch_date to datetime format
-        # orders_df["dispatch_date"] = pd.to_datetime(orders_df["dispatch_date"], dayfirst=True, errors="coerce")
-
-        # print("After conversion, dispatch_date sample:\n", orders_df[['dispatch_date']].head())
-
         # Filter by status if provided
         if status:
             orders_df = orders_df[orders_df["status"] == status]
-            
+
+        # Remove rows with invalid dispatch_date
+        orders_df = orders_df.dropna(subset=["dispatch_date"])
+
         if orders_df.empty:
             print("⚠️ Warning: No matching records after status filter.")
             return pd.DataFrame()
-        # Remove rows with invalid dispatch_date
-        orders_df = orders_df.dropna(subset=['dispatch_date'])
-
-
-        def get_dispatch_breakdown(sub_df):
-            grouped = sub_df.groupby("dispatch_date")["quantity"].sum().reset_index()
-            return [
-                {
-                    "date": row["dispatch_date"],
-                    "quantity": int(row["quantity"])
-                }
-                for _, row in grouped.iterrows()
-            ]
 
-        # Group by SKU and dispatch_date
-        grouped_df = orders_df.groupby("sku").apply(lambda df: pd.Series({
-            "total_quantity": int(df["quantity"].sum()),
-            "order_count": df["order_id"].nunique(),
-            "dispatch_breakdown": get_dispatch_breakdown(df)
-        })).reset_index()
+        per_date = (
+            orders_df.groupby(["sku", "dispatch_date"], sort=True, observed=True)
+            .agg(quantity=("quantity", "sum"), order_count=("order_id", "nunique"))
+            .reset_index()
+        )
+        per_date["quantity"] = per_date["quantity"].astype(int)
+        per_date["breakdown"] = [
+            {"date": format_dispatch_date(date), "quantity": quantity}
+            for date, quantity in zip(per_date["dispatch_date"], per_date["quantity"].tolist())
+        ]
 
-        # Sort by dispatch date (earliest first)
-        grouped_df = grouped_df.sort_values(by=["sku"], ascending=[True])
+        grouped_df = (
+            per_date.groupby("sku", sort=True, observed=True)
+            .agg(
+                total_quantity=("quantity", "sum"),
+                order_count=("order_count", "sum"),
+                dispatch_breakdown=("breakdown", list),
+            )
+            .reset_index()
+        )
+        grouped_df["total_quantity"] = grouped_df["total_quantity"].astype(int)
 
         return grouped_df
 
@@ -269,162 +493,210 @@ def get_orders_grouped_by_sku(orders_df, status=None):
         print(f"Error in grouping orders: {str(e)}")
         raise
 
-#global cache
-_PRODUCT_IMG_CACHE = {}
+# Process-wide image URL cache; SKUs without an image are cached as None
+_PRODUCT_IMG_CACHE = TTLCache(maxsize=4096, ttl=900, negative_ttl=300)
+FIRESTORE_IN_LIMIT = 30  # max values in a single 'in' filter
+
+def get_product_image_urls(skus):
+    """
+    Resolve image URLs for many SKUs at once.
+
+    With the product catalog loaded this is a pure in-memory lookup. Otherwise
+    cached SKUs are answered from the TTL cache; the rest are fetched with
+    chunked 'in' queries. Returns {sku: img_url or None} keyed by the given SKUs.
+    """
+    catalog = live_catalog()
+    if catalog is not None:
+        return catalog.image_urls(sku for sku in skus if sku is not None and not pd.isna(sku))
+
+    keys = {sku: str(sku).lower().strip() for sku in skus if sku is not None and not pd.isna(sku)}
+    resolved = {}
+    missing = set()
+
+    for key in set(keys.values()):
+        found, img_url = _PRODUCT_IMG_CACHE.get(key)
+        if found:
+            resolved[key] = img_url
+        else:
+            missing.add(key)
+
+    if missing:
+        db = get_db_connection()
+        if db is not None:
+            products_ref = db.collection("products")
+            missing = sorted(missing)
+            try:
+                for start in range(0, len(missing), FIRESTORE_IN_LIMIT):
+                    chunk = missing[start:start + FIRESTORE_IN_LIMIT]
+                    fetched = {}
+                    for doc in products_ref.where("sku", "in", chunk).select(["sku", "img_url"]).stream():
+                        data = doc.to_dict()
+                        fetched.setdefault(data.get("sku"), data.get("img_url"))
+                    for key in chunk:
+                        resolved[key] = fetched.get(key)
+                        _PRODUCT_IMG_CACHE.set(key, resolved[key])
+                print(f"Image cache: fetched {len(missing)} SKUs from Firestore")
+            except Exception as e:
+                print(f"Error fetching product image URLs: {e}")
+
+    return {sku: resolved.get(key) for sku, key in keys.items()}
+
 def get_product_image_url(sku):
     try:
-        sku_lower = sku.lower().strip()
-        if sku_lower in _PRODUCT_IMG_CACHE:
-            print(f"Cache hit for SKU {sku}")
-            return _PRODUCT_IMG_CACHE[sku_lower]
-        
-        db = get_db_connection()
-        if db is None:
-            return None
-        products_ref = db.collection("products").where("sku", "==", sku_lower).limit(1)
-        docs = list(products_ref.stream())
-        
-        if not docs:
-            return None
-        img_url = docs[0].to_dict().get("img_url")
-        _PRODUCT_IMG_CACHE[sku_lower] = img_url  # Cache the result
-        print(f"Cache miss for SKU {sku}. Fetched URL: {img_url}")
-        return img_url
+        return get_product_image_urls([sku]).get(sku)
     except Exception as e:
         print(f"Error fetching product image URL for SKU {sku}: {e}")
         return None
 
-def update_orders_for_sku(sku, quantity_to_process, new_status, user=None):
-    """
-    Safe race-condition-free update for a specific SKU + dispatch_date.
-    Uses Firestore transaction to prevent multiple users from corrupting data.
+def get_image_cache_stats():
+    """Hit/miss/eviction metrics of the product image cache"""
+    return _PRODUCT_IMG_CACHE.stats()
+
+# Status each transition converts *from*
+TRANSITION_FROM = {
+    "new": "picked",
+    "picked": "new",
+    "validated": "picked",
+    "cancelled": "picked",
+    "wrong": "picked",
+}
+# Transitions that skip a step, allowed only when asked for explicitly
+DIRECT_TRANSITIONS = {("new", "validated")}
+BULK_TRANSITION_WORKERS = 8  # independent per-SKU transactions run in parallel
+
+def _transition_fields(new_status, user, old_status=None):
+    """Fields written to every order moved to new_status (updated_at is added per write)"""
+    fields = {"status": new_status}
+    if new_status == "new":
+        fields["picked_by"] = ""
+    if user:
+        if old_status == "new" and new_status != "picked":
+            # Skipped the picked step, so the same user picked it too
+            fields["picked_by"] = user
+        if new_status == "cancelled":
+            fields["validated_by"] = user
+        else:
+            fields[f"{new_status}_by"] = user
+    return fields
+
+def _resolve_old_status(new_status, from_status=None):
+    """Status the transition reads from, or None if it is not allowed"""
+    if from_status is None:
+        return TRANSITION_FROM.get(new_status)
+    if TRANSITION_FROM.get(new_status) == from_status or (from_status, new_status) in DIRECT_TRANSITIONS:
+        return from_status
+    return None
+
+def _candidates(docs):
+    """Allocation candidates for the order docs of one SKU/status"""
+    candidates = []
+    for doc in docs:
+        data = doc.to_dict()
+        candidates.append(Candidate(
+            order_id=doc.id,
+            quantity=int(data.get("quantity", 1) or 0),
+            dispatch_date=data.get("dispatch_date"),
+            created_at=data.get("created_at"),
+            ref=doc,
+        ))
+    return candidates
+
+def _run_sku_transition(db, sku, quantity_to_process, new_status, user, sku_party, old_status,
+                        strategy=DEFAULT_STRATEGY):
     """
+    Run the transactional status update for one SKU.
 
-    db = get_db_connection()
-    if db is None:
-        print("❌ DEBUG: Database connection failed")
-        # st.error("❌ Database connection failed")
-        return 0, []
-
+    quantity_to_process is either a total or {dispatch_date: quantity}.
+    Touches no Streamlit state, so it is safe to run on worker threads.
+    Returns (processed_quantity, processed_ids, snapshot); -1 means not enough
+    orders, and snapshot then holds every order of the SKU in old_status as
+    read by the transaction (None on success).
+    """
     transaction = db.transaction()
-
-    # Determine old status → what we are converting *from*
-    old_status = (
-        "picked" if new_status =="new" else
-        "new" if new_status == "picked" else
-        "picked" if new_status == "validated" else
-        "picked" if new_status == "cancelled" else
-        "picked" if new_status == "wrong" else
-        None
-    )
-
-    print(f"🔍 DEBUG: old_status={old_status}, new_status={new_status}, sku={sku}, quantity={quantity_to_process}, user={user}")
-    # st.write(f"🔍 DEBUG: old_status={old_status}, new_status={new_status}, sku={sku}")
-
-    if old_status is None:
-        print("❌ DEBUG: old_status is None - invalid transition")
-        # st.error("❌ Invalid status transition")
-        return 0, []
+    cache_fields = _transition_fields(new_status, user, old_status)
 
     @firestore.transactional
     def process(transaction):
         print(f"📝 DEBUG: Starting transaction for sku={sku}, old_status={old_status}")
         
-        # STEP 1 — READ orders safely inside transaction
-        high_query = (
+        # STEP 1 — READ orders safely inside transaction (equality filters only)
+        query = (
             db.collection("orders")
             .where("sku", "==", sku)
             .where("status", "==", old_status)
-            .where("quantity", ">", 1)
-            .order_by("created_at")
         )
+        candidates = _candidates(transaction.get(query))
 
-        low_query = (
-            db.collection("orders")
-            .where("sku", "==", sku)
-            .where("status", "==", old_status)
-            .where("quantity", "==", 1)
-            .order_by("created_at")
-        )
-
-        high_orders = list(transaction.get(high_query))
-        low_orders = list(transaction.get(low_query))
-
-
-        high_total_available = sum(order.to_dict().get("quantity", 0) for order in high_orders)
-        low_total_available = sum(order.to_dict().get("quantity", 0) for order in low_orders)
-        total_available = high_total_available + low_total_available
+        total_available = sum(c.quantity for c in candidates)
         print(f"📝 DEBUG: Total available quantity for SKU={sku} is {total_available}")
         # st.write(f"📝 DEBUG: Total available quantity for SKU={sku} is {total_available}")
 
+        if isinstance(quantity_to_process, dict):
+            selected = allocate_by_date(candidates, quantity_to_process, strategy)
+        else:
+            selected = allocate(candidates, quantity_to_process, strategy)
+
         # CRITICAL VALIDATION
-        if total_available < quantity_to_process:
+        if selected is None:
             print(f"⚠️ DEBUG: Insufficient orders. Found {total_available}, needed {quantity_to_process}")
-            # st.warning(f"⚠️ Only {total_available} orders available instead of {quantity_to_process}")
-            # st.warning("Updating local order cache to reflect current database state.")
-            st.session_state.orders_df = get_orders_from_db()
-            
-            return -1, []
-
-        processed_ids = []
-        remaining_quantity = quantity_to_process
-        processed_quantity = 0
-        selected = []
-
-        if remaining_quantity > 0:
-            for order in high_orders:
-                qty = order.to_dict().get("quantity", 1)
-                if qty <= remaining_quantity:
-                    selected.append(order)
-                    remaining_quantity -= qty
-
-        if remaining_quantity > 0:
-            for order in low_orders:
-                qty = order.to_dict().get("quantity", 1)
-                if qty <= remaining_quantity:
-                    selected.append(order)
-                    remaining_quantity -= qty
-
-        if remaining_quantity != 0:
-            print(f"❌ DEBUG: Logic error - remaining_quantity should be 0 but is {remaining_quantity}")
-            # st.error(f"❌ Logic error - remaining_quantity should be 0 but is {remaining_quantity}")
-            return -1, []
+            return -1, [], [c.ref for c in candidates]
         print(f"📝 DEBUG: Selected {len(selected)} orders for processing")
 
         # STEP 2 — UPDATE ORDER-BY-ORDER inside the same transaction
-        for order in selected:
-            ref = order.reference
-            update_fields = {
-                "status": new_status,
-                "updated_at": datetime.utcnow()
-            }
-
-            if new_status == "new":
-                update_fields = {
-                    "status": new_status,
-                    "picked_by": "",
-                    "updated_at": datetime.utcnow()
-                }
-
-            if user:
-                if new_status == "cancelled":
-                    update_fields["validated_by"] = user
-                else:
-                    update_fields[f"{new_status}_by"] = user
-
-            print(f"📝 DEBUG: Updating order {order.id} with fields: {update_fields}")
-            transaction.update(ref, update_fields)
-            # st.success(f"✅ Order {order.id} updated to {new_status}.")
-            print(f"✅ Order {order.id} marked for update to {new_status}")
-            processed_ids.append(order.id)
-            processed_quantity += order.to_dict().get("quantity", 0)
+        processed_ids = []
+        processed_quantity = 0
+        for candidate in selected:
+            update_fields = {**cache_fields, "updated_at": datetime.utcnow()}
+
+            print(f"📝 DEBUG: Updating order {candidate.order_id} with fields: {update_fields}")
+            transaction.update(candidate.ref.reference, update_fields)
+            print(f"✅ Order {candidate.order_id} marked for update to {new_status}")
+            processed_ids.append(candidate.order_id)
+            processed_quantity += candidate.quantity
+        write_counter_deltas(
+            transaction, db,
+            transition_deltas((c.ref.to_dict() for c in selected), new_status, lambda _: sku_party)
+        )
         print(f"📝 DEBUG: Transaction processing complete. processed_quantity={processed_quantity}")
-        return processed_quantity, processed_ids
-    
+        return processed_quantity, processed_ids, None
+
+    return process(transaction)
+
+def update_orders_for_sku(sku, quantity_to_process, new_status, user=None, from_status=None,
+                          dispatch_date=None, strategy=DEFAULT_STRATEGY):
+    """
+    Safe race-condition-free update for a specific SKU + dispatch_date.
+    Uses Firestore transaction to prevent multiple users from corrupting data.
+
+    from_status overrides the usual source status; pass "new" with
+    new_status="validated" to pick and validate in a single transaction.
+    dispatch_date limits the update to orders due that day; strategy picks
+    the allocation order (see db.allocation.STRATEGIES).
+    """
+
+    db = get_db_connection()
+    if db is None:
+        print("❌ DEBUG: Database connection failed")
+        # st.error("❌ Database connection failed")
+        return 0, []
+
+    print(f"🔍 DEBUG: new_status={new_status}, sku={sku}, quantity={quantity_to_process}, user={user}")
+
+    old_status = _resolve_old_status(new_status, from_status)
+    if old_status is None:
+        print("❌ DEBUG: old_status is None - invalid transition")
+        # st.error("❌ Invalid status transition")
+        return 0, []
+
+    if dispatch_date is not None:
+        quantity_to_process = {dispatch_date: quantity_to_process}
+
     # RUN the transactional function
     try:
         print(f"🚀 DEBUG: Executing transaction...")
-        processed_qty, processed_ids = process(transaction)
+        processed_qty, processed_ids, snapshot = _run_sku_transition(
+            db, sku, quantity_to_process, new_status, user, party_resolver()(sku), old_status, strategy
+        )
         print(f"✅ DEBUG: Transaction executed successfully. processed_qty={processed_qty}")
         # st.success(f"✅ Transaction complete: {processed_qty} orders updated")
     except Exception as ex:
@@ -432,21 +704,84 @@ def update_orders_for_sku(sku, quantity_to_process, new_status, user=None):
         # st.error(f"❌ Transaction error: {str(ex)}")
         raise
 
-    # STEP 3 — update Streamlit session cache (optional)
-    if "orders_df" in st.session_state and processed_ids:
-        print(f"📝 DEBUG: Updating session state for orders: {processed_ids}")
-        df = st.session_state.orders_df
-        mask = df["order_id"].isin(processed_ids)
-        df.loc[mask, "status"] = new_status
-        if user:
-            df.loc[mask, f"{new_status}_by"] = user
-        st.session_state.orders_df = df
-        print(f"✅ DEBUG: Session state updated")
-        # st.write(f"✅ DEBUG: Session state updated for {mask.sum()} rows")
+    if processed_qty == -1:
+        # Someone else moved these orders; refresh just this SKU from what the transaction read
+        reconcile_sku_orders(sku, old_status, snapshot)
+
+    # STEP 3 — update the shared order cache
+    if processed_ids:
+        print(f"📝 DEBUG: Updating order cache for orders: {processed_ids}")
+        patch_orders(processed_ids, _transition_fields(new_status, user, old_status))
+        print(f"✅ DEBUG: Order cache updated")
 
     print(f"🎯 DEBUG: Final result - processed_qty={processed_qty}, processed_ids={processed_ids}")
     return processed_qty, processed_ids
 
+def _plan_quantity(qty):
+    """Normalise one bulk plan entry; empty entries come back falsy"""
+    if isinstance(qty, dict):
+        return {date: int(q) for date, q in qty.items() if int(q) > 0}
+    return max(int(qty), 0)
+
+def update_orders_bulk(plan, new_status, user=None, strategy=DEFAULT_STRATEGY):
+    """
+    Apply one status transition to many SKUs at once.
+
+    Args:
+        plan: {sku: quantity_to_process} or {sku: {dispatch_date: quantity}}
+        new_status: Target status for every SKU in the plan
+        user: User recorded on the orders
+
+    Each SKU runs its own transaction on a thread pool; the shared order
+    cache is patched once at the end.
+
+    Returns:
+        {sku: (processed_quantity, processed_ids)}; -1 marks a SKU without
+        enough orders left, 0 a SKU whose transaction failed
+    """
+    db = get_db_connection()
+    if db is None:
+        print("❌ DEBUG: Database connection failed in update_orders_bulk")
+        return {sku: (0, []) for sku in plan}
+
+    old_status = _resolve_old_status(new_status)
+    if old_status is None:
+        print(f"❌ DEBUG: Invalid bulk transition to {new_status}")
+        return {sku: (0, []) for sku in plan}
+
+    plan = {sku: _plan_quantity(qty) for sku, qty in plan.items()}
+    plan = {sku: qty for sku, qty in plan.items() if qty}
+    party_of = party_resolver()
+    results = {}
+    snapshots = {}
+
+    with ThreadPoolExecutor(max_workers=BULK_TRANSITION_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                _run_sku_transition, db, sku, qty, new_status, user, party_of(sku), old_status, strategy
+            ): sku
+            for sku, qty in plan.items()
+        }
+        for future in as_completed(futures):
+            sku = futures[future]
+            try:
+                processed_qty, ids, snapshot = future.result()
+                results[sku] = (processed_qty, ids)
+                if snapshot is not None:
+                    snapshots[sku] = snapshot
+            except Exception as ex:
+                print(f"❌ DEBUG: Transaction for SKU={sku} failed: {ex}")
+                results[sku] = (0, [])
+
+    processed_ids = [order_id for _, ids in results.values() for order_id in ids]
+    for sku, snapshot in snapshots.items():
+        reconcile_sku_orders(sku, old_status, snapshot)
+    if processed_ids:
+        patch_orders(processed_ids, _transition_fields(new_status, user, old_status))
+
+    print(f"🎯 DEBUG: Bulk {new_status}: {len(processed_ids)} orders over {len(plan)} SKUs")
+    return results
+
 def calculate_order_counts():
     import utils
     """
@@ -456,12 +791,24 @@ def calculate_order_counts():
         Dictionary with counts for each status
     """
     counts = {'new': 0, 'picked': 0, 'validated': 0}
+    party_filter = st.session_state.get("party_filter", "Both")
+
+    # Maintained counter documents first, then aggregation queries (party
+    # scoped via the stamped party field), then the shared in-memory order table
+    scoped_party = None if str(party_filter).upper() == "BOTH" else party_filter
+    counted = read_status_counts(scoped_party)
+    if counted is not None:
+        for status in ["new", "picked", "validated"]:
+            counted.setdefault(status, 0)
+        return counted
 
-    if "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()
+    aggregated = aggregate_status_counts(scoped_party)
+    if aggregated is not None:
+        return aggregated
+
+    load_orders()
 
     orders_df = st.session_state.orders_df  # Get the cached orders DataFrame
-    party_filter = st.session_state.get("party_filter", "Both")
     orders_df = utils.get_party_filter_df(orders_df, party_filter)
 
     if not orders_df.empty:
@@ -0,0 +1,146 @@
+"""
+Process-wide party rules, cached under a version number
+
+The party_rules collection is read once per process and compiled into a
+PartyMatcher. Writers bump meta/party_rules.version; readers check that one
+document at most every RULES_VERSION_CHECK seconds and reload only when it
+moved, so other processes pick up edits without streaming the rules on every
+rerun.
+"""
+import threading
+import time
+
+from firebase_admin import firestore
+import streamlit as st
+
+from db.firestore import get_db_connection
+
+RULES_META = ("meta", "party_rules")
+RULES_VERSION_CHECK = 60  # seconds between version checks
+MATCH_MEMO_LIMIT = 50_000  # SKUs remembered per matcher
+
+
+class PartyMatcher:
+    """
+    Party lookup compiled from the rules.
+
+    Each party's prefix, include and exclude lists become sets keyed by
+    prefix length, so a SKU is matched by slicing it once per distinct
+    length instead of scanning every rule. Results are memoised per SKU.
+    First matching party wins, in rules order, like party_for_sku.
+    """
+
+    def __init__(self, rules):
+        self.parties = list(rules)
+        self._compiled = []
+        lengths = set()
+        for party_name, party_rules in rules.items():
+            include = set(party_rules.get("prefix", ())) | set(party_rules.get("special_include", ()))
+            exclude = set(party_rules.get("special_exclude", ()))
+            lengths.update(len(p) for p in include | exclude)
+            self._compiled.append((party_name, include, exclude))
+        self._lengths = sorted(lengths)
+        self._memo = {}
+
+    def party_of(self, sku):
+        """First party whose rules match sku, or "" when none does"""
+        sku = str(sku).upper().strip()
+        party = self._memo.get(sku)
+        if party is None:
+            if len(self._memo) >= MATCH_MEMO_LIMIT:
+                self._memo.clear()
+            party = self._memo[sku] = self._match(sku)
+        return party
+
+    def parties_of(self, sku):
+        """Every party whose own rules match sku, in rules order"""
+        heads = self._heads(str(sku).upper().strip())
+        return tuple(name for name, include, exclude in self._compiled if heads & include and not heads & exclude)
+
+    def matches(self, sku, party_name):
+        """Whether party_name's own rules match sku (ignores rule order)"""
+        heads = self._heads(str(sku).upper().strip())
+        for name, include, exclude in self._compiled:
+            if name == party_name:
+                return bool(heads & include) and not heads & exclude
+        return False
+
+    def _heads(self, sku):
+        return {sku[:n] for n in self._lengths if n <= len(sku)}
+
+    def _match(self, sku):
+        heads = self._heads(sku)
+        for name, include, exclude in self._compiled:
+            if heads & include and not heads & exclude:
+                return name
+        return ""
+
+
+def fetch_party_rules(db):
+    """Read the party_rules collection into {party_name: {prefix, special_include, special_exclude}}"""
+    rules = {}
+    for doc in db.collection("party_rules").stream():
+        data = doc.to_dict()
+        rules[data.get("party_name")] = {
+            "prefix": tuple(data.get("prefix", [])),
+            "special_include": tuple(data.get("special_include", [])),
+            "special_exclude": tuple(data.get("special_exclude", [])),
+        }
+    return rules
+
+
+class PartyRulesCache:
+    """Rules and matcher for the current rules version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = None
+        self._matcher = None
+        self._checked_at = 0.0
+        self.version = None
+        self.loads = 0
+
+    def get(self):
+        """Return (rules, matcher), reloading only when the version moved"""
+        with self._lock:
+            now = time.monotonic()
+            if self._rules is None or now - self._checked_at > RULES_VERSION_CHECK:
+                self._refresh()
+                self._checked_at = now
+            return self._rules, self._matcher
+
+    def invalidate(self):
+        with self._lock:
+            self._rules = None
+
+    def _refresh(self):
+        db = get_db_connection()
+        if db is None:
+            if self._rules is None:
+                self._rules, self._matcher = {}, PartyMatcher({})
+            return
+
+        meta = db.collection(RULES_META[0]).document(RULES_META[1]).get()
+        version = (meta.to_dict() or {}).get("version", 0) if meta.exists else 0
+        if self._rules is not None and version == self.version:
+            return
+
+        self._rules = fetch_party_rules(db)
+        self._matcher = PartyMatcher(self._rules)
+        self.version = version
+        self.loads += 1
+        print(f"✅ Party rules loaded (version={version}, parties={len(self._rules)})")
+
+
+@st.cache_resource
+def get_party_rules_cache():
+    return PartyRulesCache()
+
+
+def bump_party_rules_version(db):
+    """Record a rules change so every process reloads, and reload this one"""
+    db.collection(RULES_META[0]).document(RULES_META[1]).set(
+        {"version": firestore.Increment(1), "updated_at": firestore.SERVER_TIMESTAMP},
+        merge=True,
+    )
+    get_party_rules_cache().invalidate()
@@ -0,0 +1,101 @@
+"""
+Party field stamped on order documents
+
+add_orders_to_db stamps each new order with the party its SKU belongs to.
+restamp_order_parties brings existing orders in line after party rules change
+(update_sku_party runs it for the moved SKU) and doubles as the one-off
+backfill for orders ingested before the field existed. Once the backfill has
+finished, party-scoped counts can use where("party", "==", ...) queries.
+"""
+from collections import Counter
+from datetime import datetime
+
+from db.counters import counter_key, party_resolver, write_counter_deltas
+from db.firestore import get_db_connection
+
+PARTY_STAMP_META = ("meta", "order_party")  # written when a full backfill completes
+RESTAMP_CHUNK_SIZE = 200  # order updates per batch, leaving room for counter moves
+FIRESTORE_IN_LIMIT = 30
+
+
+def party_field(party):
+    """Value stored in the party field; "" when no party rule matches"""
+    return str(party or "").upper()
+
+
+def party_stamped(db):
+    """Party-filtered queries are only trusted once the backfill has completed"""
+    return db.collection(PARTY_STAMP_META[0]).document(PARTY_STAMP_META[1]).get().exists
+
+
+def _order_docs(db, skus):
+    fields = ["sku", "party", "status", "updated_at"]
+    orders_ref = db.collection("orders")
+    if skus is None:
+        yield from orders_ref.select(fields).stream()
+        return
+    skus = sorted({str(s).upper() for s in skus})
+    for start in range(0, len(skus), FIRESTORE_IN_LIMIT):
+        chunk = skus[start:start + FIRESTORE_IN_LIMIT]
+        yield from orders_ref.where("sku", "in", chunk).select(fields).stream()
+
+
+def restamp_order_parties(skus=None, on_progress=None):
+    """
+    Set the party field on orders whose stored party disagrees with the rules.
+
+    Args:
+        skus: Only restamp these SKUs; None walks every order (backfill)
+        on_progress: Optional callback(scanned, updated)
+
+    Orders that already had a party move their status counters to the new
+    party in the same batch. Returns the number of orders updated.
+    """
+    db = get_db_connection()
+    if db is None:
+        print("❌ Database connection failed in restamp_order_parties")
+        return 0
+
+    party_of = party_resolver()
+    scanned = updated = 0
+    batch, ops, deltas = db.batch(), 0, Counter()
+
+    def flush():
+        nonlocal batch, ops, deltas
+        if ops:
+            write_counter_deltas(batch, db, deltas)
+            batch.commit()
+        batch, ops, deltas = db.batch(), 0, Counter()
+
+    for doc in _order_docs(db, skus):
+        scanned += 1
+        data = doc.to_dict()
+        party = party_field(party_of(data.get("sku", "")))
+        if "party" in data and data["party"] == party:
+            continue
+
+        batch.update(doc.reference, {"party": party})
+        if "party" in data and data.get("updated_at"):
+            status = data.get("status")
+            deltas[counter_key(data["party"], status, data["updated_at"])] -= 1
+            deltas[counter_key(party, status, data["updated_at"])] += 1
+        ops += 1
+        updated += 1
+        if ops >= RESTAMP_CHUNK_SIZE:
+            flush()
+            if on_progress:
+                on_progress(scanned, updated)
+
+    flush()
+    if on_progress:
+        on_progress(scanned, updated)
+
+    if skus is None:
+        db.collection(PARTY_STAMP_META[0]).document(PARTY_STAMP_META[1]).set({
+            "backfilled_at": datetime.utcnow(),
+            "orders_scanned": scanned,
+            "orders_updated": updated,
+        })
+
+    print(f"✅ Party restamp: {updated} of {scanned} orders updated")
+    return updated
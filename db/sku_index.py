@@ -0,0 +1,115 @@
+"""
+Incrementally maintained SKU aggregates for the picker and validator queues
+"""
+import pandas as pd
+
+from db.order_schema import format_dispatch_date
+
+ALL_PARTIES = "BOTH"
+GROUP_COLUMNS = ["sku", "total_quantity", "order_count", "dispatch_breakdown"]
+ROW_COLUMNS = ["status", "sku", "dispatch_date", "quantity"]
+
+
+class SkuAggregateIndex:
+    """
+    Quantity and order count per (status, party, sku, dispatch_date).
+
+    Built once from the order table, then kept current by applying the
+    before/after rows of orders whose status changed, so the picker and
+    validator queues never regroup the whole dataset. A SKU is kept under
+    every party whose rules match it, like utils.get_party_filter_df.
+    """
+
+    def __init__(self, parties_of, parties=()):
+        self._parties_of = parties_of  # sku -> names of every matching party
+        self._parties = {str(p).upper() for p in parties}
+        self._sku_parties = {}
+        self._cells = {}  # status -> party -> sku -> dispatch_date -> [quantity, order_count]
+        self._views = {}
+        self.version = 0
+
+    @classmethod
+    def build(cls, orders_df, parties_of, parties=()):
+        index = cls(parties_of, parties)
+        if orders_df.empty or not set(ROW_COLUMNS).issubset(orders_df.columns):
+            return index
+
+        grouped = (
+            orders_df.dropna(subset=["dispatch_date"])
+            .groupby(["status", "sku", "dispatch_date"], observed=True)
+            .agg(quantity=("quantity", "sum"), order_count=("quantity", "size"))
+            .reset_index()
+        )
+        for status, sku, date, quantity, order_count in grouped.itertuples(index=False):
+            index._add(status, sku, date, int(quantity), int(order_count))
+        return index
+
+    def apply(self, old_rows, new_rows):
+        """Apply a change: remove the old versions of rows and add the new ones"""
+        for row in _iter_rows(old_rows):
+            self._add(*row, quantity_sign=-1)
+        for row in _iter_rows(new_rows):
+            self._add(*row)
+        self._views.clear()
+        self.version += 1
+
+    def groups(self, status, party=ALL_PARTIES):
+        """Return the grouped queue in get_orders_grouped_by_sku's shape, sorted by SKU"""
+        key = (status, str(party).upper())
+        if key not in self._views:
+            self._views[key] = self._build_view(*key)
+        return self._views[key]
+
+    def _build_view(self, status, party):
+        by_party = self._cells.get(status, {})
+        if party in self._parties:
+            names = [party] if party in by_party else []
+        else:
+            # "Both" (or a party without rules) sees every SKU
+            names = list(by_party)
+
+        skus = {}  # a SKU under several parties has equal cells in each
+        for name in names:
+            for sku, dates in by_party[name].items():
+                skus.setdefault(sku, {}).update(dates)
+
+        rows = []
+        for sku in sorted(skus):
+            dates = skus[sku]
+            breakdown = [
+                {"date": format_dispatch_date(date), "quantity": cell[0]}
+                for date, cell in sorted(dates.items())
+            ]
+            rows.append({
+                "sku": sku,
+                "total_quantity": sum(cell[0] for cell in dates.values()),
+                "order_count": sum(cell[1] for cell in dates.values()),
+                "dispatch_breakdown": breakdown,
+            })
+
+        return pd.DataFrame(rows, columns=GROUP_COLUMNS) if rows else pd.DataFrame()
+
+    def _add(self, status, sku, date, quantity, order_count=1, quantity_sign=1):
+        if sku not in self._sku_parties:
+            self._sku_parties[sku] = tuple(self._parties_of(sku)) or ("",)
+
+        for party in self._sku_parties[sku]:
+            dates = self._cells.setdefault(status, {}).setdefault(party, {}).setdefault(sku, {})
+            cell = dates.setdefault(date, [0, 0])
+            cell[0] += quantity_sign * quantity
+            cell[1] += quantity_sign * order_count
+
+            if cell[1] <= 0:
+                del dates[date]
+                if not dates:
+                    del self._cells[status][party][sku]
+
+
+def _iter_rows(rows):
+    """Yield (status, sku, dispatch_date, quantity) for rows that count toward the index"""
+    if rows is None or len(rows) == 0:
+        return
+    for status, sku, date, quantity in rows.reindex(columns=ROW_COLUMNS).itertuples(index=False):
+        if pd.isna(date) or pd.isna(status) or pd.isna(sku):
+            continue
+        yield status, sku, date, int(quantity) if pd.notna(quantity) else 0
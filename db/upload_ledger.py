@@ -0,0 +1,144 @@
+"""
+Upload ledger: fingerprints of imported order exports
+
+Every finished upload records its file's SHA-256 in upload_ledger, so the
+same file uploaded again for the same platform is skipped without parsing.
+Each raw row is also hashed (hash_pandas_object over the row's cells) and
+the hashes of imported rows are kept per platform in ROW_HASH_SHARDS
+documents of upload_row_hashes. A re-export then only processes rows that
+are new or whose content changed (e.g. a Meesho order that became
+cancelled) since any earlier import.
+
+Each shard stores its (hash, day) pairs packed into one bytes field rather
+than a map, so the document costs a single index entry instead of one per
+hash (a map would hit the 40,000 index entries per document limit long
+before the size limit). Every upload reads all shards of its platform, at
+12 bytes per remembered row.
+
+Row hashes are written only after an upload succeeds and expire after
+ROW_HASH_DAYS. Two uploads finishing at the same moment can overwrite each
+other's shard; the lost hashes only mean those rows are processed again.
+"""
+import hashlib
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+UPLOAD_LEDGER = "upload_ledger"
+ROW_LEDGER = "upload_row_hashes"
+ROW_HASH_SHARDS = 32
+ROW_HASH_DAYS = 45  # row hashes older than this are dropped when a shard is rewritten
+ROW_SHARD_LIMIT = 60_000  # entries per shard document (12 bytes each, ~720 KB of the 1 MiB limit)
+ROW_ENTRY = np.dtype([("hash", "<u8"), ("day", "<u4")])
+
+
+def file_fingerprint(data):
+    """SHA-256 of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_upload(db, fingerprint, platform):
+    """Ledger entry of an earlier import of this exact file, or None"""
+    snap = db.collection(UPLOAD_LEDGER).document(fingerprint).get()
+    if not snap.exists:
+        return None
+    entry = snap.to_dict()
+    return entry if entry.get("platform") == platform else None
+
+
+def record_upload(db, fingerprint, platform, filename, stats):
+    db.collection(UPLOAD_LEDGER).document(fingerprint).set({
+        "platform": platform,
+        "file": filename,
+        "imported_at": datetime.utcnow(),
+        **stats,
+    })
+
+
+def row_hashes(raw):
+    """Content hash of each raw row as a uint64"""
+    return pd.util.hash_pandas_object(raw.astype(str), index=False).to_numpy().tolist()
+
+
+def _shard_of(row_hash):
+    return row_hash % ROW_HASH_SHARDS
+
+
+def pack_entries(entries):
+    """{hash: day} as the bytes stored in a shard document"""
+    packed = np.empty(len(entries), dtype=ROW_ENTRY)
+    packed["hash"] = list(entries.keys())
+    packed["day"] = list(entries.values())
+    return packed.tobytes()
+
+
+def unpack_entries(data):
+    packed = np.frombuffer(data or b"", dtype=ROW_ENTRY)
+    return dict(zip(packed["hash"].tolist(), packed["day"].tolist()))
+
+
+class RowLedger:
+    """
+    Row hashes already imported for one platform.
+
+    fresh(raw) keeps the rows not seen before and remembers their hashes;
+    commit() stores them once the upload has gone through.
+    """
+
+    def __init__(self, db, platform):
+        self._db = db
+        self.platform = platform
+        self._known = {}
+        self._new = {}
+        self.unchanged = 0
+
+    def _refs(self):
+        collection = self._db.collection(ROW_LEDGER)
+        return [collection.document(f"{self.platform}-{n:02d}") for n in range(ROW_HASH_SHARDS)]
+
+    def load(self):
+        for snap in self._db.get_all(self._refs()):
+            if snap.exists:
+                self._known.update(unpack_entries((snap.to_dict() or {}).get("entries")))
+        print(f"📒 Row ledger for {self.platform}: {len(self._known)} known rows")
+        return self
+
+    def fresh(self, raw):
+        """Rows of raw that are new or changed since the last import"""
+        if raw.empty:
+            return raw
+        today = date.today().toordinal()
+        keep = []
+        for h in row_hashes(raw):
+            new = h not in self._known and h not in self._new
+            if new:
+                self._new[h] = today
+            keep.append(new)
+        self.unchanged += len(keep) - sum(keep)
+        return raw[keep]
+
+    def commit(self):
+        """Write the shards that gained rows, dropping expired hashes"""
+        if not self._new:
+            return 0
+        cutoff = date.today().toordinal() - ROW_HASH_DAYS
+        shards = {}
+        for h, day in {**self._known, **self._new}.items():
+            if day >= cutoff:
+                shards.setdefault(_shard_of(h), {})[h] = day
+
+        touched = {_shard_of(h) for h in self._new}
+        refs = self._refs()
+        # One write per shard: a batch of full shards could pass the request size limit
+        for n in sorted(touched):
+            entries = shards.get(n, {})
+            if len(entries) > ROW_SHARD_LIMIT:
+                newest = sorted(entries.items(), key=lambda item: item[1], reverse=True)
+                entries = dict(newest[:ROW_SHARD_LIMIT])
+            refs[n].set({"platform": self.platform, "count": len(entries), "entries": pack_entries(entries)})
+
+        written = len(self._new)
+        self._known.update(self._new)
+        self._new = {}
+        return written
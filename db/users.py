@@ -2,7 +2,9 @@
 User management functions for Firestore database
 """
 from google.cloud import firestore as gcf
+from db.aggregations import aggregate_user_productivity
 from db.firestore import get_db_connection
+from db.party_rules import bump_party_rules_version, get_party_rules_cache
 import streamlit as st
 import pandas as pd
 
@@ -140,21 +142,38 @@ def get_user_type(username):
         return 1  # Default fallback
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def get_usernames():
+    """All user ids (document ids of the users collection)"""
+    db = get_db_connection()
+    if db is None:
+        print("❌ Database connection failed in get_usernames")
+        return []
+    return sorted(doc.id for doc in db.collection("users").select(["type"]).stream())
+
 def get_user_productivity():
-    """Get productivity data by user from session state"""
+    """Get productivity data by user"""
     import utils
-    
+
+    columns = ['user', 'picked_count', 'picked_quantity', 'validated_count', 'validated_quantity']
+    party_filter = st.session_state.get("party_filter", "Both")
+
+    # Firestore aggregation queries per user, scoped by the stamped party field
+    scoped_party = None if str(party_filter).upper() == "BOTH" else party_filter
+    rows = aggregate_user_productivity(tuple(get_usernames()), scoped_party)
+    if rows is not None:
+        return pd.DataFrame(rows, columns=columns)
+
     if "orders_df" not in st.session_state or st.session_state.orders_df.empty:
-        return pd.DataFrame(columns=['user', 'picked_count', 'picked_quantity', 'validated_count', 'validated_quantity'])
+        return pd.DataFrame(columns=columns)
 
     orders_df = st.session_state.orders_df
-    party_filter = st.session_state.get("party_filter", "Both")
     orders_df = utils.get_party_filter_df(orders_df, party_filter)
 
     # Filter and group data for picked orders
     picked_summary = (
         orders_df[orders_df["picked_by"].notna()]
-        .groupby("picked_by")
+        .groupby("picked_by", observed=True)
         .agg(picked_count=("picked_by", "count"), picked_quantity=("quantity", "sum"))
         .reset_index()
         .rename(columns={"picked_by": "user"})
@@ -163,7 +182,7 @@ def get_user_productivity():
     # Filter and group data for validated orders
     validated_summary = (
         orders_df[orders_df["validated_by"].notna()]
-        .groupby("validated_by")
+        .groupby("validated_by", observed=True)
         .agg(validated_count=("validated_by", "count"), validated_quantity=("quantity", "sum"))
         .reset_index()
         .rename(columns={"validated_by": "user"})
@@ -179,22 +198,12 @@ def get_user_productivity():
     return productivity_df
 
 def load_party_rules():
-    db = get_db_connection()
-    docs = db.collection("party_rules").stream()
-
-    rules = {}
-    for doc in docs:
-        data = doc.to_dict()
-
-        party_name = data.get("party_name")
+    """Party rules for the current rules version (cached per process)"""
+    return get_party_rules_cache().get()[0]
 
-        rules[party_name] = {
-            "prefix": tuple(data.get("prefix", [])),
-            "special_include": tuple(data.get("special_include", [])),
-            "special_exclude": tuple(data.get("special_exclude", [])),
-        }
-
-    return rules
+def party_matcher():
+    """Compiled matcher for the current party rules"""
+    return get_party_rules_cache().get()[1]
 
 def sku_matches_party(sku: str, rules: dict) -> bool:
     sku = sku.upper().strip()
@@ -209,7 +218,17 @@ def sku_matches_party(sku: str, rules: dict) -> bool:
 
     return (matches_prefix or is_included) and not is_excluded
 
+def party_for_sku(sku, rules: dict) -> str:
+    """Return the first party whose rules match the SKU, or "" when none does"""
+    for party_name, party_rules in rules.items():
+        if sku_matches_party(str(sku), party_rules):
+            return party_name
+    return ""
+
 def update_sku_party(sku, old_party, new_party):
+    from db.order_store import get_order_store
+    from db.party_stamp import restamp_order_parties
+
     db = get_db_connection()
     if db is None:
         error_msg = "❌ Database connection failed in update_sku_party"
@@ -249,17 +268,24 @@ def update_sku_party(sku, old_party, new_party):
         if not skipped_old_party:
             old_doc_ref.update({"special_include": gcf.ArrayRemove([sku])})
         new_doc_ref.update({"special_exclude": gcf.ArrayRemove([sku])})
+        bump_party_rules_version(db)
 
-        #if the sku already follows the party rules after the above operation, then we can skip adding it to the new party's special_include and old party's special_exclude
+        #if the sku already follows the party rules after the above operation, then we can skip adding it to the new party's special_include
         rules = load_party_rules()
-        if sku_matches_party(sku, rules.get(new_party, {})):
-            print(f"✅ SKU {sku} already matches party rules for {new_party}")
-            return True
+        if not sku_matches_party(sku, rules.get(new_party, {})):
+            new_doc_ref.update({"special_include": gcf.ArrayUnion([sku])})
 
-        # add sku to special_include of new party and add sku to special_exclude of old party
-        if not skipped_old_party:
-            old_doc_ref.update({"special_exclude": gcf.ArrayUnion([sku])})
-        new_doc_ref.update({"special_include": gcf.ArrayUnion([sku])})
+        # exclude the sku from every other party that still matches it (the old party,
+        # or any prefix party when moving from "Both"), so only new_party claims it
+        matcher = party_matcher()
+        claimants = [name for name in rules if name != new_party and matcher.matches(sku, name)]
+        for name in claimants:
+            docs = party_rules_ref.where("party_name", "==", name).limit(1).get()
+            if docs:
+                docs[0].reference.update({"special_exclude": gcf.ArrayUnion([sku])})
+        bump_party_rules_version(db)
+        get_order_store().invalidate_index()
+        restamp_order_parties([sku])
         print(f"✅ SKU {sku} moved from {old_party} to {new_party} successfully")
         return True
     except Exception as e:
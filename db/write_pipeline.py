@@ -0,0 +1,285 @@
+"""
+Shared parallel write pipeline for bulk Firestore writes
+
+Callers describe their writes as WriteGroups: a few operations that must
+land together, plus the counter deltas they cause. The pipeline packs whole
+groups into WriteBatches of at most MAX_BATCH_OPS operations (counter writes
+included, merged per batch) and commits them on a thread pool.
+
+- Rate: writes start at RAMP_START_OPS per second and grow by RAMP_GROWTH
+  every RAMP_INTERVAL seconds (Firestore's 500/50/5 guidance).
+- Retries: commits failing with Aborted or ResourceExhausted (rejected
+  before anything was applied) are retried with exponential backoff and
+  jitter. ServiceUnavailable is only retried for batches without counter
+  deltas: such a commit may still have landed, and replaying its plain
+  sets, updates and deletes is harmless, but replaying Increment would
+  count twice. Counter batches that fail that way are reported as failed
+  (reconcile_order_counters repairs any drift).
+- Errors: a batch that still fails is split and committed group by group,
+  so one bad operation only fails its own group. Each group's future carries
+  its outcome and errors lists (key, message) for failed groups.
+- Metrics: stats() reports ops, batches, retries, failures and throughput.
+
+BulkWriter is not used because it cannot commit an order write and its
+counter increments atomically.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from google.api_core import exceptions as api_exceptions
+
+from db.counters import write_counter_deltas
+
+MAX_BATCH_OPS = 500  # Firestore limit per commit
+PIPELINE_WORKERS = 4
+RAMP_START_OPS = 500
+RAMP_GROWTH = 1.5
+RAMP_INTERVAL = 300  # seconds
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5  # seconds, doubled per attempt
+RETRYABLE = (api_exceptions.Aborted, api_exceptions.ResourceExhausted)  # nothing was applied
+RETRYABLE_IDEMPOTENT = RETRYABLE + (api_exceptions.ServiceUnavailable,)  # may have been applied
+
+
+class WriteGroup:
+    """Operations committed atomically, with the counter deltas they cause"""
+
+    def __init__(self, key=None, deltas=None):
+        self.key = key
+        self.ops = []
+        self.deltas = Counter(deltas or {})
+
+    def set(self, ref, data, merge=False):
+        self.ops.append(("set", ref, data, merge))
+        return self
+
+    def update(self, ref, data):
+        self.ops.append(("update", ref, data, None))
+        return self
+
+    def delete(self, ref):
+        self.ops.append(("delete", ref, None, None))
+        return self
+
+
+class _RateLimiter:
+    """Token bucket whose rate ramps up over the pipeline's lifetime"""
+
+    def __init__(self, start_rate):
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._start_rate = start_rate
+        self._tokens = float(MAX_BATCH_OPS)
+        self._last = self._start
+
+    def rate(self):
+        steps = int((time.monotonic() - self._start) // RAMP_INTERVAL)
+        return self._start_rate * RAMP_GROWTH ** steps
+
+    def acquire(self, ops):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.rate()
+                self._tokens = min(max(rate, MAX_BATCH_OPS), self._tokens + (now - self._last) * rate)
+                self._last = now
+                if self._tokens >= ops:
+                    self._tokens -= ops
+                    return
+                wait = (ops - self._tokens) / rate
+            time.sleep(wait)
+
+
+class WritePipeline:
+    """
+    Pack WriteGroups into batches and commit them in parallel.
+
+    Use as a context manager, or call close() to wait for every commit:
+
+        with WritePipeline(db, "ingest") as pipeline:
+            future = pipeline.submit(WriteGroup(key=order_id).set(ref, doc))
+        pipeline.stats()
+
+    submit() returns a Future resolving to True, or raising the commit error
+    for that group. Groups wait in the open batch until it fills or flush().
+    """
+
+    def __init__(self, db, label="writes", workers=PIPELINE_WORKERS, start_rate=RAMP_START_OPS):
+        self._db = db
+        self.label = label
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"write-{label}")
+        self._slots = threading.BoundedSemaphore(workers * 2)  # batches queued or committing
+        self._limiter = _RateLimiter(start_rate)
+        self._lock = threading.Lock()
+        self._open = []
+        self._open_ops = 0
+        self._open_counters = set()
+        self._started = time.monotonic()
+        self._finished = None
+        self.errors = []
+        self._stats = Counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, group):
+        """Queue a group; returns a Future for its commit"""
+        future = Future()
+        if not group.ops:
+            future.set_result(True)
+            return future
+
+        counter_keys = {k for k, v in group.deltas.items() if v}
+        if len(group.ops) + len(counter_keys) > MAX_BATCH_OPS:
+            raise ValueError(f"Write group {group.key} has more than {MAX_BATCH_OPS} operations")
+
+        ready = None
+        with self._lock:
+            needed = len(group.ops) + len(counter_keys - self._open_counters)
+            if self._open and self._open_ops + len(self._open_counters) + needed > MAX_BATCH_OPS:
+                ready = self._take_open()
+            self._open.append((group, future))
+            self._open_ops += len(group.ops)
+            self._open_counters |= counter_keys
+        if ready:
+            self._dispatch(ready)
+        return future
+
+    def flush(self):
+        """Send the open batch now instead of waiting for it to fill"""
+        with self._lock:
+            ready = self._take_open()
+        if ready:
+            self._dispatch(ready)
+
+    def close(self):
+        """Flush and wait for every commit; returns stats()"""
+        self.flush()
+        self._executor.shutdown(wait=True)
+        if self._finished is None:
+            self._finished = time.monotonic()
+            stats = self.stats()
+            print(
+                f"✅ Write pipeline {self.label}: {stats['ops']} ops in {stats['batches']} batches, "
+                f"{stats['failed_groups']} failed groups, {stats['retries']} retries, "
+                f"{stats['ops_per_sec']:.0f} ops/s"
+            )
+        return self.stats()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        elapsed = (self._finished or time.monotonic()) - self._started
+        return {
+            "groups": stats.get("groups", 0),
+            "failed_groups": stats.get("failed_groups", 0),
+            "ops": stats.get("ops", 0),
+            "batches": stats.get("batches", 0),
+            "retries": stats.get("retries", 0),
+            "elapsed": elapsed,
+            "ops_per_sec": stats.get("ops", 0) / elapsed if elapsed > 0 else 0.0,
+            "rate_limit": self._limiter.rate(),
+        }
+
+    def _take_open(self):
+        ready = self._open
+        self._open, self._open_ops, self._open_counters = [], 0, set()
+        return ready
+
+    def _dispatch(self, entries):
+        self._slots.acquire()
+        future = self._executor.submit(self._commit_entries, entries)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _commit_entries(self, entries):
+        try:
+            self._commit_with_retry([group for group, _ in entries])
+        except Exception as e:
+            if len(entries) > 1:
+                # Isolate the failing group(s) so the rest still land
+                for entry in entries:
+                    self._commit_entries([entry])
+                return
+            group, future = entries[0]
+            print(f"❌ Write pipeline {self.label}: group {group.key} failed: {e}")
+            with self._lock:
+                self._stats["failed_groups"] += 1
+                self.errors.append((group.key, str(e)))
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._stats["groups"] += len(entries)
+        for _, future in entries:
+            future.set_result(True)
+
+    def _commit_with_retry(self, groups):
+        batch = self._db.batch()
+        deltas = Counter()
+        ops = 0
+        for group in groups:
+            for kind, ref, data, merge in group.ops:
+                if kind == "set":
+                    batch.set(ref, data, merge=bool(merge))
+                elif kind == "update":
+                    batch.update(ref, data)
+                else:
+                    batch.delete(ref)
+                ops += 1
+            deltas.update(group.deltas)
+        deltas = Counter({key: delta for key, delta in deltas.items() if delta})
+        write_counter_deltas(batch, self._db, deltas)
+        ops += len(deltas)
+
+        retryable = RETRYABLE if deltas else RETRYABLE_IDEMPOTENT
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._limiter.acquire(ops)
+            try:
+                batch.commit()
+                break
+            except retryable as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                delay = BACKOFF_BASE * 2 ** (attempt - 1) * (1 + random.random())
+                print(f"⚠️ Write pipeline {self.label}: retry {attempt} in {delay:.1f}s ({e})")
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+
+        with self._lock:
+            self._stats["ops"] += ops
+            self._stats["batches"] += 1
+
+
+def tally(report, writes, ok_key):
+    """
+    Future resolving to report once every write future has settled.
+
+    Each landed write adds one to report[ok_key], each failed one to
+    report["failed"]. Lets a caller queue many chunks before a single flush().
+    """
+    done = Future()
+    if not writes:
+        done.set_result(report)
+        return done
+
+    lock = threading.Lock()
+    remaining = [len(writes)]
+
+    def settled(write):
+        with lock:
+            report[ok_key if write.exception() is None else "failed"] += 1
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            done.set_result(report)
+
+    for write in writes:
+        write.add_done_callback(settled)
+    return done
@@ -1,22 +1,22 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import firebase_admin
-from firebase_admin import firestore, credentials, initialize_app
-from google.cloud.firestore_v1 import Client as FirestoreClient
-import database
-
-# Initialize Firebase
-if not firebase_admin._apps:
-    firebase_credentials = dict(st.secrets["firebase"])
-    cred = credentials.Certificate(firebase_credentials)
-    initialize_app(cred)
-db = firestore.client()
+from firebase_admin import firestore
+from core.jobs import JobRunner
+from db.counters import counter_key, party_resolver
+from db.firestore import get_db_connection
+from db.write_pipeline import WriteGroup, WritePipeline
+
+PREVIEW_PAGE_SIZE = 50
+DELETE_PASS_SIZE = 2000  # documents read and deleted per pass
+DELETE_WORKERS = 1  # purges run one at a time per process
 
 def get_collections():
     """Fetch all available collections"""
-    collections = db.collections()
-    return [col.id for col in collections]
+    db = get_db_connection()
+    if db is None:
+        return []
+    return [col.id for col in db.collections()]
 
 def parse_datetime(value):
     """Try multiple datetime formats"""
@@ -33,45 +33,127 @@ def parse_datetime(value):
             continue
     raise ValueError(f"Invalid datetime format: {value}")
 
-def preview_docs(collection, field, operator, value):
-    """Preview documents matching the condition"""
+def build_query(db, collection, field, operator, value):
+    """Query for the condition; value is compared as a datetime when it parses as one"""
     try:
-        # Convert value to datetime if needed
-        datetime_val = parse_datetime(value)
-        query_ref = db.collection(collection).where(field, operator, datetime_val)
+        value = parse_datetime(value)
     except ValueError:
-        # Treat as regular value if not datetime
-        query_ref = db.collection(collection).where(field, operator, value)
-    
-    docs = []
-    for doc in query_ref.stream():
+        pass  # Treat as regular value if not datetime
+    return db.collection(collection).where(field, operator, value)
+
+def count_docs(query):
+    """Exact number of matches from a count() aggregation (no documents read)"""
+    return query.count(alias="count").get()[0][0].value
+
+def preview_page(query, cursor=None, page_size=PREVIEW_PAGE_SIZE):
+    """
+    One page of matching documents.
+
+    Returns (DataFrame, last snapshot); pass the snapshot back as cursor to
+    get the next page (start_after).
+    """
+    page_query = query.limit(page_size)
+    if cursor is not None:
+        page_query = page_query.start_after(cursor)
+
+    docs, last = [], None
+    for doc in page_query.stream():
+        last = doc
         doc_data = doc.to_dict()
         # Convert Firestore timestamps to readable strings
         for key, val in doc_data.items():
             if isinstance(val, firestore.firestore.DatetimeWithNanoseconds):
                 doc_data[key] = val.strftime("%Y-%m-%d %H:%M:%S")
         docs.append({"ID": doc.id, **doc_data})
-    
-    return pd.DataFrame(docs)
+
+    return pd.DataFrame(docs), last
+
+def _delete_group(doc, party_of):
+    """Delete one document; orders also take their status counter down"""
+    group = WriteGroup(key=doc.id)
+    if party_of is not None:
+        data = doc.to_dict() or {}
+        if data.get("updated_at") and data.get("status"):
+            group.deltas[counter_key(party_of(data.get("sku", "")), data["status"], data["updated_at"])] -= 1
+    return group.delete(doc.reference)
+
+def _purge(job, collection, field, operator, value):
+    """
+    Job body: delete every match in passes of DELETE_PASS_SIZE.
+
+    Each pass re-runs the query, so deleted documents drop out and a resumed
+    job simply carries on with whatever still matches.
+    """
+    db = get_db_connection()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+
+    query = build_query(db, collection, field, operator, value)
+    job.set(total=job.counters.get("deleted", 0) + count_docs(query), failed=0)
+    party_of = party_resolver() if collection == "orders" else None
+    fields = ["sku", "status", "updated_at"] if party_of else []
+
+    with WritePipeline(db, "purge") as pipeline:
+        while True:
+            docs = list(query.select(fields).limit(DELETE_PASS_SIZE).stream())
+            if not docs:
+                break
+            futures = [pipeline.submit(_delete_group(doc, party_of)) for doc in docs]
+            pipeline.flush()
+            failed = sum(future.exception() is not None for future in futures)
+            job.add(deleted=len(docs) - failed, passes=1)
+            if failed:
+                # Failed documents would come back in the next pass; stop and let the admin resume
+                job.add(failed=failed)
+                raise RuntimeError(f"{failed} deletes failed: {pipeline.errors[:3]}")
+
+    return {"deleted": job.counters.get("deleted", 0)}
+
+@st.cache_resource
+def get_delete_runner():
+    return JobRunner(max_workers=DELETE_WORKERS)
 
 def delete_docs(collection, field, operator, value):
-    """Delete documents matching the condition"""
-    try:
-        datetime_val = parse_datetime(value)
-        query_ref = db.collection(collection).where(field, operator, datetime_val)
-    except ValueError:
-        query_ref = db.collection(collection).where(field, operator, value)
-    
-    docs_ref = query_ref.stream()
-    batch = db.batch()
-    deleted_count = 0
-    
-    for doc in docs_ref:
-        batch.delete(doc.reference)
-        deleted_count += 1
-    
-    batch.commit()
-    return deleted_count
+    """Start a background purge of the matching documents; returns its job id"""
+    return get_delete_runner().submit(
+        "purge",
+        _purge,
+        collection,
+        field,
+        operator,
+        value,
+        meta={"collection": collection, "condition": f"{field} {operator} {value}"},
+    )
+
+@st.fragment(run_every=1)
+def _purge_progress(job_id):
+    """Poll the running purge once a second"""
+    job = get_delete_runner().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+        return
+
+    counters = job.snapshot()["counters"]
+    deleted, total = counters.get("deleted", 0), counters.get("total", 0)
+    st.progress(min(deleted / total, 1.0) if total else 0.0, text=f"Deleted {deleted} of {total}")
+
+def render_purge_job(job_id):
+    """Show the state of the latest purge"""
+    runner = get_delete_runner()
+    job = runner.get(job_id)
+    if job is None:
+        return
+
+    snapshot = job.snapshot()
+    if not job.finished:
+        _purge_progress(job_id)
+    elif snapshot["error"]:
+        st.error(f"Deleted {snapshot['counters'].get('deleted', 0)} documents, then: {snapshot['error']}")
+        if st.button("Resume Delete"):
+            runner.resume(job_id)
+            st.rerun()
+    else:
+        st.success(f"Deleted {snapshot['result']['deleted']} documents ({snapshot['condition']})")
 
 def render_delete_panel():
     # Streamlit UI
@@ -81,6 +163,7 @@ def render_delete_panel():
     # Step 1: Select Collection
     # collections = get_collections()
     # selected_collection = st.selectbox("Select Collection", collections)
+    collection = "orders"
 
     # Step 2: Define Condition
     col1, col2, col3 = st.columns(3)
@@ -91,19 +174,56 @@ def render_delete_panel():
     with col3:
         value = st.text_input("Value", placeholder="2025-03-26 17:52:27")
 
-    # Step 3: Preview & Delete
-    if st.button("Preview Matching Documents"):
+    db = get_db_connection()
+    if db is None:
+        st.error("Database connection failed")
+        return
+
+    # Step 3: Preview page by page
+    condition = (collection, field, operator, value)
+    if st.button("Preview Matching Documents") and field:
         try:
-            df = preview_docs("orders", field, operator, value)
-            if not df.empty:
-                st.dataframe(df)
-                st.success(f"Found {len(df)} documents")
-                
-                if st.button("⚠️ Delete All", type="primary"):
-                    deleted_count = delete_docs("orders", field, operator, value)
-                    st.success(f"Deleted {deleted_count} documents!")
-                    st.experimental_rerun()
-            else:
-                st.warning("No matching documents found")
+            total = count_docs(build_query(db, *condition))
+            st.session_state.delete_preview = {"condition": condition, "total": total, "cursors": [None]}
         except Exception as e:
-            st.error(f"Error: {str(e)}")
\ No newline at end of file
+            st.error(f"Error: {str(e)}")
+
+    preview = st.session_state.get("delete_preview")
+    if preview and preview["condition"] == condition:
+        if preview["total"] == 0:
+            st.warning("No matching documents found")
+        else:
+            render_preview(db, preview)
+
+            # Step 4: Delete in the background
+            if st.button("⚠️ Delete All", type="primary"):
+                st.session_state.delete_job_id = delete_docs(*condition)
+                st.session_state.delete_preview = None
+                st.rerun()
+
+    job_id = st.session_state.get("delete_job_id")
+    if job_id:
+        render_purge_job(job_id)
+
+def render_preview(db, preview):
+    """Current preview page with Previous / Next buttons"""
+    cursors = preview["cursors"]
+    page = len(cursors) - 1
+    try:
+        df, last = preview_page(build_query(db, *preview["condition"]), cursors[-1])
+    except Exception as e:
+        st.error(f"Error: {str(e)}")
+        return
+
+    st.success(f"Found {preview['total']} documents")
+    st.dataframe(df)
+    shown = page * PREVIEW_PAGE_SIZE
+    st.caption(f"Showing {shown + 1}–{shown + len(df)} of {preview['total']}")
+
+    col1, col2 = st.columns(2)
+    if col1.button("⬅️ Previous", disabled=page == 0):
+        cursors.pop()
+        st.rerun()
+    if col2.button("Next ➡️", disabled=last is None or shown + len(df) >= preview["total"]):
+        cursors.append(last)
+        st.rerun()
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from utils import get_swipe_card_html,next_sku
-from database import get_orders_grouped_by_sku, update_orders_for_sku, calculate_order_counts,get_orders_from_db
+from database import get_orders_grouped_by_sku, update_orders_for_sku, calculate_order_counts,load_orders
 import time
 
 def pick_sku():
@@ -34,8 +34,7 @@ def render_picker_panel():
     # Main Picker Panel
     st.header("Order Picking")
 
-    if "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()  # Fetch only once
+    load_orders()
 
     st.session_state.sku_groups = get_orders_grouped_by_sku(st.session_state.orders_df, status='new')
 
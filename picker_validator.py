@@ -2,8 +2,11 @@ import streamlit as st
 import pandas as pd
 import database
 from utils import get_swipe_card_html,next_sku
-from database import get_orders_grouped_by_sku, update_orders_for_sku, calculate_order_counts,get_orders_from_db,get_product_image_url,out_of_stock
+from database import get_orders_grouped_by_sku, get_sku_groups, update_orders_for_sku, calculate_order_counts,load_orders,get_product_image_url,get_product_image_urls,out_of_stock
 import time
+from core.constants import SKU_LEASE_SECONDS
+from db.leases import acquire_sku_lease, leased_skus, release_sku_lease
+from db.order_schema import format_dispatch_date
 from validator import render_validator_panel
 import utils
 
@@ -48,32 +51,19 @@ def pick_sku(page_info):
 
     # print(f"DEBUG: pick_sku called for SKU={sku}, quantity={total_quantity}")
     # st.success(f"DEBUG: pick_sku called for SKU={sku}, quantity={total_quantity}")
-    time.sleep(0.5)  # UX delay
+    new_status = page_info['new_status']
+    from_status = None
+    if st.session_state.get("user_type") == 3 and new_status == "picked":
+        # Combined picker/validator: pick and validate in one transaction
+        new_status, from_status = "validated", "new"
 
     processed_quantity, processed_order_ids = update_orders_for_sku(
         sku, 
         total_quantity, 
-        page_info['new_status'],
-        st.session_state.user_role
+        new_status,
+        st.session_state.user_role,
+        from_status=from_status
     )
-    
-    # print(f"DEBUG: First update returned processed_quantity={processed_quantity}")
-    # st.success(f"DEBUG: First update returned processed_quantity={processed_quantity}")
-    time.sleep(0.5)  # UX delay
-    
-    if st.session_state.get("user_type") == 3:
-        # print(f"DEBUG: user_type is 3, performing secondary validation")
-        # st.success(f"DEBUG: user_type is 3, performing secondary validation")
-        # perform validation on the same picked orders
-        processed_quantity2, processed_order_ids = update_orders_for_sku(
-            sku, 
-            total_quantity, 
-            "validated",
-            st.session_state.user_role
-        )
-        # print(f"DEBUG: Secondary update returned processed_quantity2={processed_quantity2}")
-        # st.success(f"DEBUG: Secondary update returned processed_quantity2={processed_quantity2}")
-        time.sleep(0.5)  # UX delay
 
     if processed_quantity == -1:
         # print(f"DEBUG: ERROR - Not enough quantity for SKU={sku}")
@@ -82,41 +72,63 @@ def pick_sku(page_info):
             f"Someone already validated/picked these orders.",
             icon="⚠️"
         )
-        time.sleep(0.5)  # UX delay
         return
     
     if processed_quantity > 0:
-        # print(f"DEBUG: SUCCESS - {page_info['new_status']} {processed_quantity} units of {sku}")
-        st.success(f"{page_info['new_status']} {processed_quantity} units of {sku}!")
-        time.sleep(0.5)  # UX delay
-    
-    time.sleep(0.5)  # UX delay
+        # print(f"DEBUG: SUCCESS - {new_status} {processed_quantity} units of {sku}")
+        st.toast(f"{new_status} {processed_quantity} units of {sku}!", icon="✅")
+        release_claimed_sku()
+
     # next_sku()  # Move to next SKU
 
-# @st.cache_data(ttl=30)
-def cached_orders():
-    return get_orders_from_db()
+def claim_sku(sku):
+    """Hold the lease on the SKU whose card is shown; False if another picker holds it"""
+    user = st.session_state.user_role
+    held = st.session_state.get("sku_lease")
+    now = time.time()
+    if held and held["sku"] == sku and held["renew_at"] > now:
+        return True
+    if held and held["sku"] != sku:
+        release_sku_lease(held["sku"], user)
+        st.session_state.sku_lease = None
+    if not acquire_sku_lease(sku, user):
+        return False
+    # Renew halfway through the lease so it never lapses while the card is shown
+    st.session_state.sku_lease = {"sku": sku, "renew_at": now + SKU_LEASE_SECONDS / 2}
+    return True
+
+def release_claimed_sku():
+    held = st.session_state.get("sku_lease")
+    if held:
+        release_sku_lease(held["sku"], st.session_state.user_role)
+        st.session_state.sku_lease = None
 
 # @st.cache_data
 def cached_group_orders(df, status):
     return get_orders_grouped_by_sku(df, status)
 
 def without_images_df(df):
-    without_images = []
-
-    for _, row in df.iterrows():
-        sku = row["sku"]
+    """Keep only rows whose SKU has no product image"""
+    if df.empty:
+        return df
 
-        img_url = get_product_image_url(sku)
+    img_urls = get_product_image_urls(df["sku"].unique())
+    has_image = df["sku"].map(lambda sku: bool(img_urls.get(sku)))
 
-        if img_url:
-            continue  # Skip rows with images
-        else:
-            without_images.append(row)
+    return df[~has_image]
 
-    df_without = pd.DataFrame(without_images)
+def unclaimed_orders(df):
+    """Orders with neither picked_by nor validated_by set"""
+    df = df[df['picked_by'].isna() | (df['picked_by'] == "")]
+    return df[df['validated_by'].isna() | (df['validated_by'] == "")]
 
-    return df_without
+def has_claimed_orders(df, status):
+    """Whether any order in status has picked_by or validated_by set"""
+    if df.empty or 'status' not in df.columns:
+        return False
+    df = df[df['status'] == status]
+    claimed = (df['picked_by'].notna() & (df['picked_by'] != "")) | (df['validated_by'].notna() & (df['validated_by'] != ""))
+    return bool(claimed.any())
 
 def render_picker_validator_panel(which_page):
     """Render the validator panel if which_page is 'validator', else picker panel"""
@@ -135,20 +147,31 @@ def render_picker_validator_panel(which_page):
 
     st.divider()
 
-    if "orders_df" not in st.session_state:
-        with st.spinner("Loading orders..."):
-            st.session_state.orders_df = cached_orders()
+    with st.spinner("Loading orders..."):
+        load_orders()
 
-    #get orders picked_by is empty or null
-    df= st.session_state.orders_df
-    df = df[df['picked_by'].isna() | (df['picked_by'] == "")]
-    df = df[df['validated_by'].isna() | (df['validated_by'] == "")]
     party_filter = st.session_state.get("party_filter", "Both")
-    df = utils.get_party_filter_df(df, party_filter)
 
-    if show_filters:
-        unique_dispatch_dates = df['dispatch_date'].unique()
-        selected_dispatch_date = st.selectbox("Filter by Dispatch Date", options=["All"] + list(unique_dispatch_dates))
+    if not show_filters and not has_claimed_orders(st.session_state.orders_df, page_info['status']):
+        # Unfiltered queue comes straight from the incrementally maintained index;
+        # it does not know picked_by/validated_by, so it is only used while no
+        # order in this status carries either
+        st.session_state.sku_groups = get_sku_groups(page_info['status'], party_filter)
+    elif not show_filters:
+        df = unclaimed_orders(st.session_state.orders_df)
+        df = utils.get_party_filter_df(df, party_filter)
+        st.session_state.sku_groups = cached_group_orders(df, status=page_info['status'])
+    else:
+        #get orders picked_by is empty or null
+        df = unclaimed_orders(st.session_state.orders_df)
+        df = utils.get_party_filter_df(df, party_filter)
+
+        unique_dispatch_dates = sorted(df['dispatch_date'].dropna().unique())
+        selected_dispatch_date = st.selectbox(
+            "Filter by Dispatch Date",
+            options=["All"] + list(unique_dispatch_dates),
+            format_func=lambda d: d if d == "All" else format_dispatch_date(pd.Timestamp(d))
+        )
         if selected_dispatch_date != "All":
             df = df[df['dispatch_date'] == selected_dispatch_date]
 
@@ -168,9 +191,16 @@ def render_picker_validator_panel(which_page):
             if image_filter == "Without Images":
                 df = without_images_df(df)
 
-    st.session_state.sku_groups = cached_group_orders(
-        df,
-        status= page_info['status'])
+        st.session_state.sku_groups = cached_group_orders(
+            df,
+            status= page_info['status'])
+
+    # Skip SKUs another picker is working on
+    leased = leased_skus(st.session_state.user_role)
+    if leased and not st.session_state.sku_groups.empty:
+        st.session_state.sku_groups = st.session_state.sku_groups[
+            ~st.session_state.sku_groups["sku"].isin(leased)
+        ].reset_index(drop=True)
 
     sku_groups = st.session_state.sku_groups
 
@@ -185,6 +215,15 @@ def render_picker_validator_panel(which_page):
         st.info(f"No orders available to {st.session_state.page}. Please wait for the admin to upload orders.")
         st.stop()  # Prevent further execution
 
+    # Lease the SKU on the card; drop SKUs someone else grabbed meanwhile
+    while not claim_sku(sku_groups.iloc[st.session_state.current_index]['sku']):
+        sku_groups = sku_groups.drop(sku_groups.index[st.session_state.current_index]).reset_index(drop=True)
+        st.session_state.sku_groups = sku_groups
+        if sku_groups.empty:
+            st.info("All remaining SKUs are being picked by others. Please try again shortly.")
+            st.stop()
+        st.session_state.current_index %= len(sku_groups)
+
     # Display SKU details
     current_sku_group = sku_groups.iloc[st.session_state.current_index]
     sku = current_sku_group['sku']
@@ -31,6 +31,8 @@ def _render_orders_elegant(df: pd.DataFrame, orders_ref):
         by=["updated_at"],
         ascending=False
     )
+    img_urls = database.get_product_image_urls(df["sku"].unique())
+
     # Group by date
     for date, date_group in df.groupby("date"):
 
@@ -42,7 +44,7 @@ def _render_orders_elegant(df: pd.DataFrame, orders_ref):
             with st.expander(f"📦 SKU: {sku} ({len(sku_group)})", expanded=False):
 
                 #show option to view imges via get_product_image_url
-                img_url = database.get_product_image_url(sku)
+                img_url = img_urls.get(sku)
                 for idx, row in sku_group.iterrows():
 
                     order_id = row["order_id"]
@@ -117,11 +119,10 @@ def _render_order_edit_form(order_data, orders_ref, idx):
                         new_picked_by = current_user
                         new_validated_by = current_user
 
-                orders_ref.document(order_id).update({
+                database.update_order_fields(order_id, {
                     "status": new_status,
                     "picked_by": new_picked_by,
                     "validated_by": new_validated_by,
-                    "updated_at": datetime.utcnow()
                 })
                 st.success("✅ Order updated successfully")
             except Exception as e:
@@ -133,25 +134,13 @@ def render_search_panel():
 
     db = database.get_db_connection()
     orders_ref = db.collection("orders")
-    users_ref = db.collection("users")
-    product_ref = db.collection("products")
     st.subheader("Search Criteria")
 
-    # ---------- LOAD USERS ONCE ----------
-    user_docs = users_ref.stream()
-    user_list = sorted([doc.id for doc in user_docs])
-    user_list.insert(0, "Any")
+    # ---------- USERS / PRODUCTS (cached, no per-rerun scans) ----------
+    user_list = ["Any"] + list(database.get_usernames())
 
     #product list
-    product_list = set()
-
-    for doc in product_ref.stream():
-        sku = doc.to_dict().get("sku")
-        if sku:
-            product_list.add(sku)
-
-    product_list = sorted(product_list)
-    product_list.insert(0, "Any")
+    product_list = ["Any"] + list(database.get_product_skus())
 
     # ---------- UI INPUTS ----------
     col1, col2 = st.columns(2)
@@ -0,0 +1,101 @@
+"""
+Tests for db.allocation
+
+Run from the repository root:
+    python -m pytest tests
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.allocation import STRATEGIES, Candidate, allocate, allocate_by_date
+
+BASE = datetime(2026, 10, 1, 9, 0)
+
+
+def order(order_id, quantity, dispatch_date="05-10-2026", minutes=0):
+    return Candidate(order_id, quantity, dispatch_date, BASE + timedelta(minutes=minutes), None)
+
+
+def ids(chosen):
+    return sorted(c.order_id for c in chosen)
+
+
+def total(chosen):
+    return sum(c.quantity for c in chosen)
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_every_strategy_allocates_the_exact_quantity(strategy):
+    candidates = [order("a", 2, minutes=0), order("b", 3, minutes=1), order("c", 4, minutes=2)]
+
+    chosen = allocate(candidates, 7, strategy)
+
+    assert total(chosen) == 7
+    assert len({c.order_id for c in chosen}) == len(chosen)
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_no_exact_combination_returns_none(strategy):
+    candidates = [order("a", 2), order("b", 4)]
+
+    assert allocate(candidates, 3, strategy) is None
+    assert allocate(candidates, 7, strategy) is None  # more than is open
+
+
+def test_zero_quantity_allocates_nothing():
+    assert allocate([order("a", 1)], 0) == []
+
+
+def test_earliest_dispatch_prefers_orders_due_first():
+    candidates = [
+        order("late", 1, "09-10-2026"),
+        order("early", 1, "03-10-2026"),
+        order("middle", 1, "05-10-2026"),
+    ]
+
+    assert ids(allocate(candidates, 2, "earliest_dispatch")) == ["early", "middle"]
+
+
+def test_exact_fit_prefers_a_single_matching_order():
+    candidates = [order("a", 1, minutes=0), order("b", 2, minutes=1), order("c", 3, minutes=2)]
+
+    assert ids(allocate(candidates, 3, "exact_fit")) == ["c"]
+
+
+def test_fewest_orders_minimises_the_order_count():
+    candidates = [order(f"single{i}", 1, minutes=i) for i in range(4)] + [order("four", 4, minutes=10)]
+
+    assert ids(allocate(candidates, 4, "fewest_orders")) == ["four"]
+
+
+def test_case_where_a_greedy_pass_fails():
+    # Greedy by dispatch date takes 3, then cannot reach 4 with 2 + 2
+    candidates = [
+        order("three", 3, "03-10-2026"),
+        order("two_a", 2, "04-10-2026"),
+        order("two_b", 2, "05-10-2026"),
+    ]
+
+    chosen = allocate(candidates, 4, "earliest_dispatch")
+
+    assert ids(chosen) == ["two_a", "two_b"]
+
+
+def test_dispatch_date_limits_candidates_to_that_day():
+    candidates = [order("due3", 2, "03-10-2026"), order("due5", 2, "05-10-2026")]
+
+    assert ids(allocate(candidates, 2, dispatch_date="05-10-2026")) == ["due5"]
+    assert ids(allocate(candidates, 2, dispatch_date=datetime(2026, 10, 5))) == ["due5"]
+    assert allocate(candidates, 4, dispatch_date="05-10-2026") is None
+
+
+def test_allocate_by_date_allocates_each_day_separately():
+    candidates = [
+        order("a", 1, "03-10-2026"),
+        order("b", 2, "03-10-2026"),
+        order("c", 2, "05-10-2026"),
+    ]
+
+    assert ids(allocate_by_date(candidates, {"03-10-2026": 3, "05-10-2026": 2})) == ["a", "b", "c"]
+    assert allocate_by_date(candidates, {"03-10-2026": 3, "05-10-2026": 3}) is None
@@ -0,0 +1,56 @@
+"""
+Tests for db.sku_index
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import pandas as pd
+
+from db.party_rules import PartyMatcher
+from db.sku_index import SkuAggregateIndex
+
+RULES = {
+    "KV": {"prefix": ("KV",), "special_include": ("SHARED-1",), "special_exclude": ()},
+    "JC": {"prefix": ("JC", "SHARED"), "special_include": (), "special_exclude": ()},
+}
+
+
+def orders(*rows):
+    return pd.DataFrame(
+        [{"status": "new", "sku": sku, "dispatch_date": pd.Timestamp(date), "quantity": qty} for sku, date, qty in rows]
+    )
+
+
+def skus(index, party):
+    groups = index.groups("new", party)
+    return sorted(groups["sku"]) if not groups.empty else []
+
+
+def build(df):
+    return SkuAggregateIndex.build(df, PartyMatcher(RULES).parties_of, RULES.keys())
+
+
+def test_sku_matching_several_parties_is_listed_under_each():
+    index = build(orders(("KV-1", "2026-10-05", 1), ("JC-1", "2026-10-05", 2), ("SHARED-1", "2026-10-05", 3)))
+
+    assert skus(index, "KV") == ["KV-1", "SHARED-1"]
+    assert skus(index, "JC") == ["JC-1", "SHARED-1"]
+    assert skus(index, "Both") == ["JC-1", "KV-1", "SHARED-1"]
+
+
+def test_both_view_does_not_double_count_shared_skus():
+    index = build(orders(("SHARED-1", "2026-10-05", 3), ("SHARED-1", "2026-10-06", 1)))
+
+    row = index.groups("new", "Both").iloc[0]
+    assert row["total_quantity"] == 4
+    assert row["order_count"] == 2
+
+
+def test_apply_removes_a_shared_sku_from_every_party():
+    df = orders(("SHARED-1", "2026-10-05", 3))
+    index = build(df)
+    index.apply(df, None)
+
+    assert skus(index, "KV") == []
+    assert skus(index, "JC") == []
+    assert skus(index, "Both") == []
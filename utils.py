@@ -1,14 +1,11 @@
 import io
 import logging
-from datetime import datetime, timedelta
 import re
-from typing import Optional
 
 import pandas as pd
 import streamlit as st
 
-from database import get_orders_from_db, update_status, load_party_rules
-from db.orders import bulk_update_status
+from database import load_orders, update_status, load_party_rules, party_matcher
 
 # -------------------------------------------------------------------
 # Logging Configuration
@@ -19,8 +16,6 @@ logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(message)s"
 )
 
-DATE_OUTPUT_FORMAT = "%d-%m-%Y"
-
 # -------------------------------------------------------------------
 # Session Helpers
 # -------------------------------------------------------------------
@@ -37,6 +32,10 @@ def next_sku() -> None:
 def get_party_filter_df(df: pd.DataFrame, party: str) -> pd.DataFrame:
     """
     Filter orders based on SKU prefix rules with special overrides.
+
+    Each distinct SKU is checked against this party's own rules, so a SKU
+    matching several parties shows up under each of them. (The single-valued
+    party column keeps only the first match and is not used here.)
     """
 
     if "sku" not in df.columns:
@@ -44,59 +43,14 @@ def get_party_filter_df(df: pd.DataFrame, party: str) -> pd.DataFrame:
         return df
     
     party_rules = load_party_rules()
-    if party.upper() not in party_rules:
+    party = party.upper()
+    if party not in party_rules:
         logger.warning(f"Party '{party}' not found in rules. Skipping party filter.")
         return df
 
-    df = df.copy()
-
-    sku_series = df["sku"].astype(str).str.upper().str.strip()
-
-    rules = party_rules[party.upper()]
-
-    prefix_mask = sku_series.str.startswith(rules["prefix"], na=False)
-    include_mask = sku_series.str.startswith(rules["special_include"], na=False)
-    exclude_mask = sku_series.str.startswith(rules["special_exclude"], na=False)
-
-    final_mask = (prefix_mask | include_mask) & ~exclude_mask
-
-    return df[final_mask]
-
-
-
-# -------------------------------------------------------------------
-# Date Utilities
-# -------------------------------------------------------------------
-def normalize_and_shift(raw: str) -> Optional[str]:
-    """
-    Normalize date to DD-MM-YYYY and add 2 days.
-    """
-    raw = str(raw).strip()
-
-    formats = ("%Y-%m-%d", "%d-%m-%Y")
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(raw, fmt) + timedelta(days=2)
-            return dt.strftime(DATE_OUTPUT_FORMAT)
-        except ValueError:
-            continue
-
-    return None
-
-
-# -------------------------------------------------------------------
-# File Readers
-# -------------------------------------------------------------------
-def read_uploaded_file(file_buffer, platform: str) -> pd.DataFrame:
-    """
-    Read CSV / Excel safely.
-    """
-    filename = file_buffer.name.lower()
-
-    if filename.endswith(".csv"):
-        return pd.read_csv(file_buffer, dtype=str, keep_default_na=False)
-
-    return pd.read_excel(file_buffer, dtype=str, keep_default_na=False)
+    matcher = party_matcher()
+    matches = {sku: matcher.matches(sku, party) for sku in df["sku"].dropna().unique()}
+    return df[df["sku"].map(matches).fillna(False).astype(bool)]
 
 
 def open_search_page_with_filters(
@@ -128,112 +82,6 @@ def open_search_page_with_filters(
     st.rerun()
 
 
-# -------------------------------------------------------------------
-# Meesho Processing
-# -------------------------------------------------------------------
-def process_meesho_orders(df: pd.DataFrame) -> Optional[pd.DataFrame]:
-    """
-    Process Meesho order file.
-    """
-    if df.shape[1] < 12:
-        st.error("Invalid Meesho file format.")
-        return None
-
-    status_col = df.iloc[:, 0].astype(str).str.lower().str.strip()
-
-    # --- Cancelled / Shipped / Delivered ---
-    cancelled_mask = status_col.isin({"cancelled", "shipped", "delivered"})
-    cancelled_df = df[cancelled_mask]
-
-    if not cancelled_df.empty:
-        bulk_update_status(cancelled_df, platform="meesho")
-
-    # --- Pending Orders ---
-    pending_mask = status_col.isin({"pending", "ready_to_ship"})
-    pending_df = df[pending_mask]
-
-    if pending_df.empty:
-        st.info("No pending orders found.")
-        return None
-
-    orders = pd.DataFrame({
-        "order_id": pending_df.iloc[:, 1].astype(str),
-        "sku": pending_df.iloc[:, 7].astype(str).str.upper().str.strip(),
-        "quantity": pd.to_numeric(
-            pending_df.iloc[:, 9], errors="coerce"
-        ).fillna(1).astype(int),
-        "dispatch_date": pending_df.iloc[:, 3].apply(normalize_and_shift),
-        "status": "new"
-    })
-    return clean_orders_df(orders)
-
-
-# -------------------------------------------------------------------
-# Flipkart Processing
-# -------------------------------------------------------------------
-def process_flipkart_orders(df: pd.DataFrame) -> Optional[pd.DataFrame]:
-    """
-    Process Flipkart order file.
-    """
-    orders = pd.DataFrame({
-        "order_id": df.iloc[:, 3],
-        "sku": df.iloc[:, 8].astype(str).str.upper().str.strip(),
-        "quantity": pd.to_numeric(df.iloc[:, 18], errors="coerce").fillna(1),
-        "dispatch_date": pd.to_datetime(
-            df.iloc[:, 28],
-            format="%b %d, %Y %H:%M:%S",
-            errors="coerce"
-        ).dt.strftime(DATE_OUTPUT_FORMAT),
-        "status": "new"
-    })
-
-    return clean_orders_df(orders)
-
-
-# -------------------------------------------------------------------
-# Common Cleanup
-# -------------------------------------------------------------------
-def clean_orders_df(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Remove invalid rows and normalize schema.
-    """
-    df.dropna(subset=["order_id", "sku", "dispatch_date"], inplace=True)
-    df = df[~df["sku"].isin({"", "NAN"})]
-    df["quantity"] = df["quantity"].astype(int)
-
-    if df.empty:
-        st.warning("No valid orders after cleaning.")
-        return pd.DataFrame(
-            columns=["order_id", "sku", "quantity", "dispatch_date", "status"]
-        )
-
-    logger.info("Processed %d valid orders", len(df))
-    return df
-
-
-# -------------------------------------------------------------------
-# Main Extractor
-# -------------------------------------------------------------------
-def extract_order_data(file_buffer, platform: str) -> Optional[pd.DataFrame]:
-    """
-    Platform-agnostic entry point.
-    """
-    try:
-        df = read_uploaded_file(file_buffer, platform)
-        if platform == "meesho":
-            return process_meesho_orders(df)
-
-        if platform == "flipkart":
-            return process_flipkart_orders(df)
-
-        st.error("Unsupported platform selected.")
-        return None
-
-    except Exception as exc:
-        logger.exception("Order extraction failed")
-        st.error("Failed to process file.")
-        return None
-
 def get_swipe_card_html(order_data, action_type):
     """
     Generate HTML for a swipeable card showing dispatch-wise breakdown.
@@ -262,8 +110,7 @@ def get_swipe_card_html(order_data, action_type):
     return html
 
 def export_orders_to_excel():
-    if "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()
+    load_orders()
     """
     Export orders to Excel file for download
     
@@ -3,7 +3,7 @@ import streamlit as st
 import pandas as pd
 import database
 from utils import get_swipe_card_html,next_sku
-from database import get_orders_grouped_by_sku, update_orders_for_sku, calculate_order_counts,get_orders_from_db
+from database import get_orders_grouped_by_sku, get_sku_groups, update_orders_for_sku, update_orders_bulk, calculate_order_counts, load_orders
 import time
 import json
 import utils
@@ -62,12 +62,10 @@ def render_validator_panel():
             utils.open_search_page_with_filters(status="validated",updated_from=today,updated_to=tomorrow)
             st.rerun()
 
-    if "orders_df" not in st.session_state:
-        st.session_state.orders_df = get_orders_from_db()
+    load_orders()
 
     df = st.session_state.orders_df
     party_filter = st.session_state.get("party_filter", "Both")
-    df = utils.get_party_filter_df(df, party_filter)
     df = df[df["status"] == page_info['status']]
 
     user_list = sorted([u for u in df["picked_by"].dropna().unique()])
@@ -87,12 +85,17 @@ def render_validator_panel():
         st.info(f"Showing SKUs picked by you: {picked_by_filter}")
     if picked_by_filter != "All":
         df = df[df["picked_by"] == picked_by_filter]
+        df = utils.get_party_filter_df(df, party_filter)
     
 
-    sku_groups = get_orders_grouped_by_sku(
-        df,
-        status=page_info['status']
-    )
+    if picked_by_filter == "All":
+        # Unfiltered queue comes straight from the incrementally maintained index
+        sku_groups = get_sku_groups(page_info['status'], party_filter)
+    else:
+        sku_groups = get_orders_grouped_by_sku(
+            df,
+            status=page_info['status']
+        )
 
     if sku_groups.empty:
         st.info("No validation pending")
@@ -105,6 +108,7 @@ def render_validator_panel():
     st.markdown("---")
 
     sl_no = 1
+    img_urls = database.get_product_image_urls(sku_groups["sku"])
 
     for idx, row in sku_groups.iterrows():
         sku = row["sku"]
@@ -120,7 +124,7 @@ def render_validator_panel():
         sku_col, btn_col,wng_btn,rmv_btn = st.columns([2,2,2, 2])
 
         with sku_col:
-            img_url  = database.get_product_image_url(sku)
+            img_url  = img_urls.get(sku)
             st.subheader(f"{sl_no}. SKU: {sku}")
             # if img_url then show image with link, else just show SKU
             if img_url:
@@ -145,10 +149,6 @@ def render_validator_panel():
                 else:
                     st.toast(f"No picked orders left to remove for {sku}.", icon="⚠️")
 
-                # Clear cached orders
-                if "orders_df" in st.session_state:
-                    del st.session_state["orders_df"]
-
                 time.sleep(0.5)
                 st.rerun()
 
@@ -170,10 +170,6 @@ def render_validator_panel():
                     else:
                         st.toast(f"No picked orders left to cancel for {sku}.", icon="⚠️")
 
-                    # Clear cached orders
-                    if "orders_df" in st.session_state:
-                        del st.session_state["orders_df"]
-
                     time.sleep(0.5)
                     st.rerun()
             with wng_btn:
@@ -192,10 +188,6 @@ def render_validator_panel():
                     else:
                         st.toast(f"No picked orders left to wrong for {sku}.", icon="⚠️")
 
-                    # Clear cached orders
-                    if "orders_df" in st.session_state:
-                        del st.session_state["orders_df"]
-
                     time.sleep(0.5)
                     st.rerun()
 
@@ -237,8 +229,8 @@ def render_validator_panel():
 
     if st.session_state.user_type != 1:  # Not a picker-only user 
         if st.button("Submit Validation", type="primary", use_container_width=True):
-            total_validated = 0
-
+            # Requested quantity per SKU and dispatch date
+            plan = {}
             for idx, row in sku_groups.iterrows():
                 sku = row["sku"]
                 dispatch_list = row["dispatch_breakdown"]
@@ -251,32 +243,27 @@ def render_validator_panel():
                     qty = st.session_state.validation_inputs.get(key, 0)
 
                     if qty <= 0:
-                        print(f"DEBUG: Skipping SKU={sku} d_idx={d_idx} because qty={qty}")
                         continue
+                    per_date = plan.setdefault(sku, {})
+                    per_date[dispatch["date"]] = per_date.get(dispatch["date"], 0) + qty
 
-                    processed_qty, _ = update_orders_for_sku(
-                        sku,
-                        qty,
-                        page_info['new_status'],
-                        st.session_state.user_role
+            results = update_orders_bulk(
+                plan,
+                page_info['new_status'],
+                st.session_state.user_role
+            )
+
+            total_validated = 0
+            for sku, (processed_qty, _) in results.items():
+                if processed_qty == -1:
+                    st.toast(
+                        f"❌ Not enough quantity left for SKU={sku}. "
+                        f"Someone already validated/picked these orders.",
+                        icon="⚠️"
                     )
-                    if processed_qty == -1:
-                        st.toast(
-                            f"❌ Not enough quantity left for SKU={sku}. "
-                            f"Someone already validated/picked these orders.",
-                            icon="⚠️"
-                        )
-                        time.sleep(0.8)
-                        keys_to_clear = ["orders_df"]
-                        for k in keys_to_clear:
-                            if k in st.session_state:
-                                del st.session_state[k]
-                        st.session_state.orders_df = get_orders_from_db()
-                    # print(f"DEBUG: update_orders_for_sku returned processed_qty={processed_qty} for SKU={sku}, requested_qty={qty}")
-                    total_validated += processed_qty
-
-
-            st.success(f"Validated {total_validated} items successfully!")
-            st.session_state.orders_df = get_orders_from_db()  # Refresh orders
-            time.sleep(1)
+                    continue
+                total_validated += processed_qty
+
+            # A toast survives the rerun; st.success would be wiped before it shows
+            st.toast(f"Validated {total_validated} items successfully!", icon="✅")
             st.rerun()